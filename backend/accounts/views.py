@@ -7,6 +7,7 @@ from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group
 from django.utils import timezone
 from .models import User
+from reports.cache import cached_summary
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, 
     LoginSerializer, ChangePasswordSerializer
@@ -103,53 +104,32 @@ def change_password(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_summary('dashboard_data')
 def dashboard_data(request):
     """View for getting dashboard data based on user role"""
     user = request.user
     
     if user.is_admin() or user.is_invoicing_user():
         # Admin and Invoicing User dashboard data
-        from transactions.models import SalesOrder, PurchaseOrder, CustomerInvoice, VendorBill, Payment
-        from master_data.models import Product, Contact, ChartOfAccount
-        from django.db.models import Sum, Count, Q
-        from decimal import Decimal
+        from reports import metrics
         
-        # Calculate real totals - include all invoices/bills
-        total_sales = CustomerInvoice.objects.aggregate(
-            total=Sum('grand_total'))['total'] or Decimal('0')
-        total_purchases = VendorBill.objects.aggregate(
-            total=Sum('grand_total'))['total'] or Decimal('0')
+        # One conditional-aggregation query per table
+        invoices = metrics.invoice_metrics()
+        bills = metrics.bill_metrics()
+        payments = metrics.payment_metrics()
+        contacts = metrics.contact_metrics()
+        products = metrics.product_metrics()
         
-        # Calculate proper Net Profit: Total Revenue (all invoices) - Total Costs (all bills) - Accrual Basis
-        revenue = CustomerInvoice.objects.aggregate(
-            total=Sum('grand_total'))['total'] or Decimal('0')
-        costs = VendorBill.objects.aggregate(
-            total=Sum('grand_total'))['total'] or Decimal('0')
+        # Accrual basis: all invoices minus all bills
+        revenue = invoices['total_amount']
+        costs = bills['total_amount']
         net_profit = revenue - costs
         
-        # Calculate cash balance from actual payments
-        customer_payments = Payment.objects.filter(payment_type='customer_payment').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        vendor_payments = Payment.objects.filter(payment_type='vendor_payment').aggregate(
-            total=Sum('amount'))['total'] or Decimal('0')
-        cash_balance = customer_payments - vendor_payments
+        # Cash balance from actual payments
+        cash_balance = payments['received_amount'] - payments['paid_amount']
         
-        # Count various entities
-        total_customers = Contact.objects.filter(Q(type='customer') | Q(type='both'), is_active=True).count()
-        total_vendors = Contact.objects.filter(Q(type='vendor') | Q(type='both'), is_active=True).count()
-        total_products = Product.objects.filter(is_active=True).count()
-        
-        # Pending transactions
-        pending_invoices = CustomerInvoice.objects.filter(status='pending').count()
-        pending_bills = VendorBill.objects.filter(status='pending').count()
-        
-        # Recent transactions
-        recent_pending_invoices = CustomerInvoice.objects.filter(status='pending').order_by('-invoice_date')[:3]
-        recent_payments = Payment.objects.order_by('-payment_date')[:3]
-        
-        # Get actual pending invoices and payments data
         pending_invoices_data = []
-        for invoice in recent_pending_invoices:
+        for invoice in metrics.recent_pending_invoices():
             pending_invoices_data.append({
                 'id': invoice.id,
                 'number': invoice.invoice_number,
@@ -159,7 +139,7 @@ def dashboard_data(request):
             })
         
         recent_payments_data = []
-        for payment in recent_payments:
+        for payment in metrics.recent_payments():
             recent_payments_data.append({
                 'id': payment.id,
                 'number': payment.payment_number,
@@ -170,45 +150,43 @@ def dashboard_data(request):
             })
         
         dashboard_data = {
-            'total_sales': float(total_sales),
-            'total_purchases': float(total_purchases),
+            'total_sales': float(revenue),
+            'total_purchases': float(costs),
             'revenue': float(revenue),  # Actual received revenue
             'costs': float(costs),      # Actual paid costs
             'net_profit': float(net_profit),
             'cash_balance': float(cash_balance),
-            'total_customers': total_customers,
-            'total_vendors': total_vendors,
-            'total_products': total_products,
-            'low_stock_products': 0,  # TODO: Implement stock tracking
-            'pending_invoices': pending_invoices,
-            'pending_bills': pending_bills,
-            'pending_invoices_amount': float(CustomerInvoice.objects.filter(status='pending').aggregate(
-                total=Sum('balance_due'))['total'] or Decimal('0')),
-            'pending_bills_amount': float(VendorBill.objects.filter(status='pending').aggregate(
-                total=Sum('balance_due'))['total'] or Decimal('0')),
+            'total_customers': contacts['active_customers'],
+            'total_vendors': contacts['active_vendors'],
+            'total_products': products['active'],
+            'low_stock_products': products['low_stock'],
+            'pending_invoices': invoices['pending'],
+            'pending_bills': bills['pending'],
+            'pending_invoices_amount': float(invoices['pending_amount']),
+            'pending_bills_amount': float(bills['pending_amount']),
+            'overdue_invoices_amount': float(invoices['overdue_amount']),
+            'overdue_bills_amount': float(bills['overdue_amount']),
             'pending_invoices_data': pending_invoices_data,
             'recent_payments_data': recent_payments_data,
             'last_updated': timezone.now().isoformat(),
         }
     else:
         # Contact user dashboard data
-        from transactions.models import CustomerInvoice, VendorBill
-        from django.db.models import Sum
+        from reports import metrics
         
         if hasattr(user, 'contact_profile') and user.contact_profile:
             contact = user.contact_profile
-            user_invoices = CustomerInvoice.objects.filter(customer=contact)
-            user_bills = VendorBill.objects.filter(vendor=contact)
+            invoices = metrics.invoice_metrics(customer=contact)
+            bills = metrics.bill_metrics(vendor=contact)
             
             dashboard_data = {
-                'total_invoices': user_invoices.count(),
-                'paid_invoices': user_invoices.filter(status='paid').count(),
-                'pending_invoices': user_invoices.filter(status='pending').count(),
-                'total_amount_due': float(user_invoices.filter(status='pending').aggregate(
-                    total=Sum('balance_due'))['total'] or Decimal('0')),
-                'total_bills': user_bills.count(),
-                'paid_bills': user_bills.filter(status='paid').count(),
-                'pending_bills': user_bills.filter(status='pending').count(),
+                'total_invoices': invoices['total'],
+                'paid_invoices': invoices['paid'],
+                'pending_invoices': invoices['pending'],
+                'total_amount_due': float(invoices['pending_amount']),
+                'total_bills': bills['total'],
+                'paid_bills': bills['paid'],
+                'pending_bills': bills['pending'],
             }
         else:
             dashboard_data = {
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+Check the GST portal client against a local stub server.
+
+Starts an http.server stub of the portal's HSN search on a free port and
+checks that the client reuses pooled connections, caches answers for their
+time to live, caches empty answers and errors for the shorter negative time
+to live, refuses calls over its concurrency cap, and that the circuit
+breaker opens after repeated failures and then lets exactly one trial call
+through. A call refused by the cap does not use up that trial, and a
+malformed answer counts as a failure.
+
+Usage: python check_gst_client.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from master_data.gst_client import GSTClient, UpstreamError, UpstreamUnavailable
+
+
+class StubPortal(BaseHTTPRequestHandler):
+    """
+    HSN search stub whose answer depends on inputText.
+
+    'empty...' answers with no codes, 'fail...' with HTTP 500,
+    'malformed...' with a list that is not of code objects, and 'slow...'
+    waits half a second first; anything else returns one code.
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so pooled connections can be reused
+    calls = []  # (inputText, client port) of every request
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        text = parse_qs(urlparse(self.path).query).get('inputText', [''])[0]
+        with StubPortal.lock:
+            StubPortal.calls.append((text, self.client_address[1]))
+            StubPortal.in_flight += 1
+            StubPortal.max_in_flight = max(StubPortal.max_in_flight, StubPortal.in_flight)
+        try:
+            if text.startswith('slow'):
+                time.sleep(0.5)
+            if text.startswith('fail'):
+                self._send(500, {'error': 'down'})
+            elif text.startswith('malformed'):
+                self._send(200, {'data': ['9401']})
+            elif text.startswith('empty'):
+                self._send(200, {'data': []})
+            else:
+                self._send(200, {'data': [{'c': '9401', 'n': f'Seats ({text})'}]})
+        finally:
+            with StubPortal.lock:
+                StubPortal.in_flight -= 1
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def hits(text):
+    return sum(1 for called, port in StubPortal.calls if called == text)
+
+
+def attempt(client, text):
+    """'ok', 'error' or 'unavailable' for one search"""
+    try:
+        client.search(text)
+        return 'ok'
+    except UpstreamUnavailable:
+        return 'unavailable'
+    except UpstreamError:
+        return 'error'
+
+
+def in_parallel(client, texts):
+    outcomes = [None] * len(texts)
+
+    def run(index, text):
+        outcomes[index] = attempt(client, text)
+
+    threads = [threading.Thread(target=run, args=(index, text)) for index, text in enumerate(texts)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)  # Start in order, all well within the stub's half-second delay
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def check_pooling(url):
+    client = GSTClient(url)
+    StubPortal.calls.clear()
+    for text in ['chair', 'table', 'sofa']:
+        client.search(text)
+    ports = {port for text, port in StubPortal.calls}
+    return len(StubPortal.calls) == 3 and len(ports) == 1, f'3 calls over {len(ports)} connection(s)'
+
+
+def check_cache(url):
+    client = GSTClient(url, cache_ttl=0.3)
+    first = client.search('bench')
+    second = client.search('BENCH ')
+    cached = hits('bench') == 1 and first == second
+    time.sleep(0.4)
+    client.search('bench')
+    return cached and hits('bench') == 2, f"{hits('bench')} calls for 3 searches across the time to live"
+
+
+def check_negative_cache(url):
+    client = GSTClient(url, cache_ttl=60, negative_cache_ttl=0.3, failure_threshold=100)
+    outcomes = [client.search('empty stool'), client.search('empty stool'),
+                attempt(client, 'fail stool'), attempt(client, 'fail stool')]
+    cached = outcomes == [[], [], 'error', 'error'] and hits('empty stool') == 1 and hits('fail stool') == 1
+    time.sleep(0.4)
+    client.search('empty stool')
+    attempt(client, 'fail stool')
+    expired = hits('empty stool') == 2 and hits('fail stool') == 2
+    return cached and expired, f"empty {hits('empty stool')} and failed {hits('fail stool')} calls for 3 searches each"
+
+
+def check_concurrency_cap(url):
+    client = GSTClient(url, max_concurrent=2)
+    StubPortal.max_in_flight = 0
+    outcomes = in_parallel(client, ['slow a', 'slow b', 'slow c', 'slow d'])
+    ok = outcomes == ['ok', 'ok', 'unavailable', 'unavailable'] and StubPortal.max_in_flight <= 2
+    return ok, f'outcomes {outcomes}, at most {StubPortal.max_in_flight} in flight'
+
+
+def check_breaker(url):
+    client = GSTClient(url, failure_threshold=2, reset_timeout=0.3)
+    attempt(client, 'fail one')
+    attempt(client, 'fail two')
+    opened = client.breaker.state == 'open' and attempt(client, 'refused') == 'unavailable' and hits('refused') == 0
+    time.sleep(0.4)
+    half_open = client.breaker.state == 'half-open'
+    # One trial call is let through; a second one made while it is in flight is refused
+    outcomes = in_parallel(client, ['slow trial', 'second trial'])
+    trial = outcomes == ['ok', 'unavailable'] and hits('slow trial') == 1 and hits('second trial') == 0
+    closed = client.breaker.state == 'closed' and attempt(client, 'after trial') == 'ok'
+    return opened and half_open and trial and closed, (
+        f'opened {opened}, half-open {half_open}, trial outcomes {outcomes}, closed {closed}'
+    )
+
+
+def check_breaker_trial_kept(url):
+    client = GSTClient(url, max_concurrent=1, failure_threshold=1, reset_timeout=0.3)
+    attempt(client, 'fail capped')
+    time.sleep(0.4)
+    # A trial call refused by the concurrency cap must not use up the trial
+    client._slots.acquire()
+    refused = attempt(client, 'capped trial') == 'unavailable' and hits('capped trial') == 0
+    client._slots.release()
+    recovered = attempt(client, 'after capped trial') == 'ok' and client.breaker.state == 'closed'
+
+    # Nor may a trial that fails on an unexpected answer
+    attempt(client, 'fail again')
+    time.sleep(0.4)
+    malformed = attempt(client, 'malformed trial') == 'error' and client.breaker.state == 'open'
+    time.sleep(0.4)
+    reopened = attempt(client, 'after malformed trial') == 'ok' and client.breaker.state == 'closed'
+    return refused and recovered and malformed and reopened, (
+        f'capped trial refused {refused}, then closed {recovered}; '
+        f'malformed trial failed {malformed}, then closed {reopened}'
+    )
+
+
+def check_gst_client():
+    print("=== CHECKING GST CLIENT AGAINST A STUB PORTAL ===")
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPortal)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/search'
+
+    checks = [
+        ('Connection pooling', check_pooling),
+        ('Answer cache', check_cache),
+        ('Negative cache', check_negative_cache),
+        ('Concurrency cap', check_concurrency_cap),
+        ('Circuit breaker', check_breaker),
+        ('Half-open trial kept', check_breaker_trial_kept),
+    ]
+    failures = 0
+    for name, check in checks:
+        ok, detail = check(url)
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+        failures += not ok
+
+    server.shutdown()
+    server.server_close()
+    print(f"\n{len(checks) - failures}/{len(checks)} client checks passed")
+    return failures == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check_gst_client() else 1)
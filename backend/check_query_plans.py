@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Check that report and dashboard queries are served from indexes.
+
+Runs every report endpoint against a throwaway SQLite database, captures the
+SQL it issues and asks SQLite for the query plan of each statement. Any full
+scan of a transaction or ledger table is reported as a failure.
+
+Usage: python check_query_plans.py
+"""
+import os
+import sys
+import django
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set up Django environment with an in-process cache
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shiv_accounts.settings')
+os.environ['DJANGO_CACHE'] = 'locmem'
+django.setup()
+
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from rest_framework.test import APIClient
+
+# Small lookup tables are cheaper to scan than to probe through an index
+LOOKUP_TABLES = {'users', 'contacts', 'products', 'taxes', 'chart_of_accounts', 'authtoken_token'}
+
+
+def seed_data():
+    """Create a handful of documents so every report has rows to plan for"""
+    from accounts.models import User
+    from master_data.models import Contact, Product
+    from transactions.models import CustomerInvoice, VendorBill, Payment
+
+    user = User.objects.create_user(username='planner', email='planner@example.com', password='x', role='admin')
+    customer = Contact.objects.create(name='Plan Customer', type='customer')
+    vendor = Contact.objects.create(name='Plan Vendor', type='vendor')
+    Product.objects.create(name='Plan Chair', type='goods', sales_price=100, purchase_price=60,
+                           sale_tax_percent=12, purchase_tax_percent=12, hsn_code='940140')
+
+    for i in range(5):
+        CustomerInvoice.objects.create(
+            invoice_number=f'PLAN-INV-{i}', customer=customer, invoice_date=date(2025, 1, 1 + i),
+            due_date=date(2025, 2, 1), status='pending' if i % 2 else 'paid',
+            subtotal=100, tax_total=18, grand_total=118, balance_due=118, created_by=user,
+        )
+        VendorBill.objects.create(
+            bill_number=f'PLAN-BILL-{i}', vendor=vendor, bill_date=date(2025, 1, 1 + i),
+            due_date=date(2025, 2, 1), status='pending' if i % 2 else 'paid',
+            subtotal=50, tax_total=6, grand_total=56, balance_due=56, created_by=user,
+        )
+    Payment.objects.create(
+        payment_type='customer_payment', contact=customer, payment_date=date(2025, 1, 10),
+        payment_method='bank', amount=100, created_by=user,
+    )
+    return user, customer
+
+
+def full_scans(sql):
+    """Tables the statement reads without an index"""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        plan = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for step in plan:
+        if step.startswith('SCAN ') and 'USING' not in step:
+            table = step.split()[1]
+            # Scanning a subquery's own result (e.g. a UNION being windowed) is fine
+            if table not in LOOKUP_TABLES and not table.startswith('('):
+                scans.append(step)
+    return scans
+
+
+def check_query_plans():
+    print("=== CHECKING REPORT QUERY PLANS ===")
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['*']
+    connection.creation.create_test_db(verbosity=0, keepdb=False)
+
+    user, customer = seed_data()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    endpoints = [
+        '/api/auth/dashboard-data/',
+        '/api/reports/dashboard-summary/',
+        '/api/transactions/summary/',
+        '/api/reports/balance-sheet/?as_of_date=2025-01-03',
+        '/api/reports/profit-loss/?start_date=2025-01-02&end_date=2025-01-20',
+        '/api/reports/profit-loss/?start_date=2024-12-15&end_date=2025-03-10&group_by=month',
+        '/api/reports/stock-report/?as_of_date=2025-01-03',
+        f'/api/reports/partner-ledger/?partner_id={customer.id}&start_date=2025-01-03&end_date=2025-01-20',
+        '/api/reports/receivables-aging/?as_of_date=2025-03-15',
+        '/api/reports/payables-aging/?as_of_date=2025-03-15',
+        '/api/reports/gst-summary/?month=2025-01',
+        '/api/reports/gst-summary/?month=2025-01&side=inward',
+    ]
+
+    failures = 0
+    for url in endpoints:
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+
+        selects = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('SELECT')]
+        bad = [(sql, scans) for sql in selects for scans in [full_scans(sql)] if scans]
+        if response.status_code != 200:
+            print(f"❌ {url}: HTTP {response.status_code}")
+            failures += 1
+        elif bad:
+            print(f"❌ {url}: {len(bad)} of {len(selects)} queries scan a table")
+            for sql, scans in bad:
+                print(f"     {', '.join(scans)}")
+                print(f"     {sql[:200]}")
+            failures += 1
+        else:
+            print(f"✅ {url}: {len(selects)} queries, all indexed")
+
+    connection.creation.destroy_test_db(settings.DATABASES['default']['NAME'], verbosity=0)
+    print(f"\n{len(endpoints) - failures}/{len(endpoints)} endpoints use indexes only")
+    return failures == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check_query_plans() else 1)
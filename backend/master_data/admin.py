@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Contact, Product, Tax, ChartOfAccount
+from .models import Contact, Product, Tax, ChartOfAccount, HSNCode, HSNRate
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
@@ -52,3 +52,17 @@ class ChartOfAccountAdmin(admin.ModelAdmin):
         ('Status', {'fields': ('is_active',)}),
         ('Timestamps', {'fields': ('created_at', 'updated_at')}),
     )
+
+@admin.register(HSNCode)
+class HSNCodeAdmin(admin.ModelAdmin):
+    list_display = ('code', 'type', 'description', 'updated_at')
+    list_filter = ('type',)
+    search_fields = ('code',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(HSNRate)
+class HSNRateAdmin(admin.ModelAdmin):
+    list_display = ('prefix', 'rate', 'effective_from', 'effective_to', 'description')
+    list_filter = ('rate',)
+    search_fields = ('prefix', 'description')
+    readonly_fields = ('updated_at',)
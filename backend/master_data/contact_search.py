@@ -0,0 +1,120 @@
+import hashlib
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Q
+from reports.cache import master_version
+from .hsn import _prefix_upper_bound
+from .models import Contact, normalize_search_key
+
+
+FTS_TABLE = 'contacts_fts'
+WORD = re.compile(r'\w+')
+FIELDS = ['id', 'name', 'type', 'gst_number']
+
+_fts_available = {}
+
+
+def fts_available():
+    """Whether the contacts_fts index exists on this database connection"""
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = (
+            connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[connection.alias]
+
+
+def reset_fts_available():
+    """Look for the index again on its next use"""
+    _fts_available.clear()
+
+
+def _contacts(contact_type):
+    """Active contacts of a type; customers and vendors both include contacts of type both"""
+    contacts = Contact.objects.filter(is_active=True)
+    if contact_type in ('customer', 'vendor'):
+        contacts = contacts.filter(type__in=[contact_type, 'both'])
+    return contacts
+
+
+def search_by_prefix(key, contact_type=None, limit=10):
+    """
+    Contacts whose normalized name starts with key, in name order.
+
+    A range on search_key so its index is scanned in order and the scan
+    stops once limit rows pass the active and type checks.
+    """
+    return list(_contacts(contact_type).filter(
+        search_key__gte=key, search_key__lt=_prefix_upper_bound(key)
+    ).order_by('search_key').values(*FIELDS)[:limit])
+
+
+def search_by_token(words, contact_type=None, limit=10, exclude=()):
+    """
+    Contacts with a word starting with each of words in the name, email, mobile or GST number.
+
+    Uses the FTS5 index ranked by bm25 when available and falls back to one
+    LIKE per word otherwise.
+    """
+    if fts_available():
+        try:
+            return _fts_search(words, contact_type, limit, exclude)
+        except OperationalError:
+            # The index is gone (the database was swapped or migrated back)
+            reset_fts_available()
+    match = Q()
+    for word in words:
+        match &= (
+            Q(name__icontains=word) | Q(email__icontains=word)
+            | Q(mobile__icontains=word) | Q(gst_number__icontains=word)
+        )
+    contacts = _contacts(contact_type).exclude(id__in=exclude).filter(match)
+    return list(contacts.order_by('search_key').values(*FIELDS)[:limit])
+
+
+def _fts_search(words, contact_type, limit, exclude):
+    """Ranked FTS5 matches joined to contacts, so the active, type and exclude filters apply before the limit"""
+    where = ['c.is_active']
+    params = [' AND '.join(f'"{word}"*' for word in words)]
+    if contact_type in ('customer', 'vendor'):
+        where.append('c.type IN (%s, %s)')
+        params += [contact_type, 'both']
+    if exclude:
+        where.append(f"c.id NOT IN ({', '.join(['%s'] * len(exclude))})")
+        params += list(exclude)
+    sql = (
+        f'SELECT c.id, c.name, c.type, c.gst_number FROM {FTS_TABLE} '
+        f'JOIN contacts c ON c.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s AND {" AND ".join(where)} '
+        f'ORDER BY {FTS_TABLE}.rank LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return [dict(zip(FIELDS, row)) for row in cursor.fetchall()]
+
+
+def autocomplete(text, contact_type=None, limit=10):
+    """
+    Top contacts for a typeahead, as id/name/type/gst_number dicts.
+
+    Name prefix matches come first; when there are fewer than limit, word
+    matches anywhere in the name, email, mobile or GST number follow. No
+    count is taken. Results are cached for CONTACT_AUTOCOMPLETE_CACHE_TTL
+    seconds, keyed on the contact master data version.
+    """
+    key = normalize_search_key(text)
+    if not key:
+        return []
+    digest = hashlib.md5(key.encode()).hexdigest()
+    cache_key = f'contact-autocomplete:{master_version()}:{contact_type or ""}:{limit}:{digest}'
+    results = cache.get(cache_key)
+    if results is None:
+        results = search_by_prefix(key, contact_type, limit)
+        if len(results) < limit:
+            words = WORD.findall(key)
+            results += search_by_token(
+                words, contact_type, limit - len(results), exclude=[row['id'] for row in results]
+            )
+        cache.set(cache_key, results, timeout=settings.CONTACT_AUTOCOMPLETE_CACHE_TTL)
+    return results
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(Exception):
+    """The GST portal failed or answered with something other than a list of codes"""
+
+
+class UpstreamUnavailable(UpstreamError):
+    """The call was not made: the circuit is open or too many calls are in flight"""
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after their own time to live"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(True, value) for a live entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing service for a while.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for reset_timeout seconds; then one trial call is let
+    through, which closes the circuit on success or reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('GST API circuit opened after %s failures', self.failures)
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class GSTClient:
+    """
+    Client for the GST portal's HSN search.
+
+    Calls share one pooled requests.Session, answers are kept in an LRU
+    cache (empty answers and errors for a shorter time), at most
+    max_concurrent calls are in flight, and a circuit breaker refuses calls
+    outright while the portal keeps failing.
+    """
+
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'en-US,en;q=0.9',
+    }
+
+    def __init__(self, url, timeout=5, pool_size=10, max_concurrent=4, cache_size=1000, cache_ttl=3600,
+                 negative_cache_ttl=60, failure_threshold=5, reset_timeout=30):
+        self.url = url
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.negative_cache_ttl = negative_cache_ttl
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.cache = TTLCache(cache_size)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+
+    def search(self, input_text, selected_type='byCode', category='null'):
+        """(code, description) pairs for a search, from the cache when possible"""
+        key = (input_text.strip().lower(), selected_type, category)
+        found, value = self.cache.get(key)
+        if found:
+            if isinstance(value, UpstreamError):
+                raise value
+            return value
+
+        # Take a slot first, so a half-open trial is never used up by a call the cap refuses
+        if not self._slots.acquire(blocking=False):
+            raise UpstreamUnavailable('Too many GST API calls in flight')
+        try:
+            if not self.breaker.allow():
+                raise UpstreamUnavailable('GST API circuit is open')
+            try:
+                codes = self._fetch(*key)
+            except Exception as exc:
+                # Anything else escaping here would leave a half-open trial taken for good
+                self.breaker.record_failure()
+                error = exc if isinstance(exc, UpstreamError) else UpstreamError(str(exc))
+                self.cache.set(key, error, self.negative_cache_ttl)
+                raise error from exc
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        self.cache.set(key, codes, self.cache_ttl if codes else self.negative_cache_ttl)
+        return codes
+
+    def _fetch(self, input_text, selected_type, category):
+        response = self.session.get(self.url, params={
+            'inputText': input_text,
+            'selectedType': selected_type,
+            'category': category,
+        }, timeout=self.timeout)
+        if response.status_code != 200:
+            raise UpstreamError(f'GST API returned status {response.status_code}: {response.text[:500]}')
+        try:
+            data = response.json()
+        except ValueError:
+            raise UpstreamError('GST API returned a non-JSON response')
+        if not isinstance(data, dict) or not isinstance(data.get('data'), list):
+            raise UpstreamError('GST API returned an unexpected response')
+        if not all(isinstance(item, dict) for item in data['data']):
+            raise UpstreamError('GST API returned an unexpected list of codes')
+        return [(item.get('c', ''), item.get('n', '')) for item in data['data']]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client configured from the GST_HSN_API_* settings"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GSTClient(
+                    settings.GST_HSN_API_URL,
+                    timeout=settings.GST_HSN_API_TIMEOUT,
+                    pool_size=settings.GST_HSN_API_POOL_SIZE,
+                    max_concurrent=settings.GST_HSN_API_MAX_CONCURRENT,
+                    cache_size=settings.GST_HSN_API_CACHE_SIZE,
+                    cache_ttl=settings.GST_HSN_API_CACHE_TTL,
+                    negative_cache_ttl=settings.GST_HSN_API_NEGATIVE_CACHE_TTL,
+                    failure_threshold=settings.GST_HSN_API_FAILURE_THRESHOLD,
+                    reset_timeout=settings.GST_HSN_API_RESET_TIMEOUT,
+                )
+    return _client
@@ -0,0 +1,119 @@
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .models import HSNRate
+
+
+RATES_VERSION_KEY = 'hsn-rates:version'
+RATE = ''  # Trie node key holding the rate of the prefix that ends there
+
+
+class RateTrie:
+    """
+    Prefix trie from HSN/SAC code prefixes to GST rates.
+
+    A lookup walks the code one digit at a time and keeps the deepest rate
+    passed, so the longest matching prefix wins in O(len(code)).
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, prefix, rate):
+        node = self.root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[RATE] = rate
+
+    def lookup(self, code):
+        node = self.root
+        best = node.get(RATE)
+        for digit in code:
+            node = node.get(digit)
+            if node is None:
+                break
+            best = node.get(RATE, best)
+        return best
+
+
+_tries = {}  # date -> RateTrie, for the version in _tries_version
+_tries_version = None
+_lock = threading.Lock()
+
+
+def rates_version():
+    """Version of the rate table, shared by all processes through the cache"""
+    version = cache.get(RATES_VERSION_KEY)
+    if version is None:
+        # Millisecond clock, so a version recreated after eviction never matches an old one
+        cache.add(RATES_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(RATES_VERSION_KEY)
+    return version
+
+
+def bump_rates_version():
+    """Make every process rebuild its tries on their next use"""
+    try:
+        cache.incr(RATES_VERSION_KEY)
+    except ValueError:
+        cache.set(RATES_VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def build_trie(on):
+    """Trie of the rates in effect on a date; of overlapping rows the latest effective_from wins"""
+    trie = RateTrie()
+    rows = HSNRate.objects.filter(
+        Q(effective_to__isnull=True) | Q(effective_to__gte=on), effective_from__lte=on
+    ).order_by('effective_from').values_list('prefix', 'rate')
+    for prefix, rate in rows:
+        trie.insert(prefix, rate)
+    return trie
+
+
+def rate_trie(on=None):
+    """The process's trie for a date, rebuilt after any change to the rate table"""
+    global _tries_version
+    on = on or timezone.now().date()
+    version = rates_version()
+    with _lock:
+        if version != _tries_version:
+            _tries.clear()
+            _tries_version = version
+        trie = _tries.get(on)
+    if trie is None:
+        trie = build_trie(on)
+        with _lock:
+            if _tries_version == version:
+                if len(_tries) >= 16:
+                    _tries.clear()
+                _tries[on] = trie
+    return trie
+
+
+def default_rate():
+    return Decimal(str(getattr(settings, 'HSN_DEFAULT_GST_RATE', '18')))
+
+
+def resolve_rates(codes, on=None):
+    """GST rate of each code on a date (default today), as {code: Decimal}"""
+    trie = rate_trie(on)
+    fallback = default_rate()
+    rates = {}
+    for code in codes:
+        if code not in rates:
+            rate = trie.lookup(''.join(ch for ch in str(code) if ch.isdigit()))
+            rates[code] = fallback if rate is None else rate
+    return rates
+
+
+def resolve_rate(code, on=None):
+    return resolve_rates([code], on)[code]
+
+
+def format_rate(rate):
+    """'12' for 12.00 and '0.25' for 0.25, as the HSN search has always returned"""
+    return format(rate.normalize(), 'f')
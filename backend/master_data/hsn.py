@@ -0,0 +1,124 @@
+import re
+from django.db import OperationalError, connection
+from django.utils import timezone
+from .models import HSNCode
+
+
+FTS_TABLE = 'hsn_codes_fts'
+WORD = re.compile(r'\w+')
+
+# selectedType/category values sent by the frontend (same as the GST portal's)
+CATEGORY_TYPES = {'P': 'goods', 'S': 'service'}
+
+_fts_available = {}
+
+
+def fts_available():
+    """Whether the hsn_codes_fts index exists on this database connection"""
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = (
+            connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[connection.alias]
+
+
+def reset_fts_available():
+    """Look for the index again on its next use"""
+    _fts_available.clear()
+
+
+def code_type(code):
+    """SAC codes are the services chapter 99; everything else is an HSN goods code"""
+    return 'service' if code.startswith('99') else 'goods'
+
+
+def _prefix_upper_bound(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search_by_code(prefix, code_type=None, limit=50):
+    """
+    Codes starting with prefix, in code order.
+
+    Written as a range (code >= prefix AND code < next prefix) rather than
+    LIKE so the unique index on code is scanned directly.
+    """
+    prefix = re.sub(r'\D', '', prefix)
+    if not prefix:
+        return []
+    codes = HSNCode.objects.filter(code__gte=prefix, code__lt=_prefix_upper_bound(prefix))
+    if code_type:
+        codes = codes.filter(type=code_type)
+    return list(codes.order_by('code')[:limit])
+
+
+def search_by_description(text, code_type=None, limit=50):
+    """
+    Codes whose description contains every word of text (as word prefixes), best match first.
+
+    Uses the FTS5 index ranked by bm25 when available and falls back to one
+    LIKE per word otherwise.
+    """
+    words = [word.lower() for word in WORD.findall(text)]
+    if not words:
+        return []
+    if fts_available():
+        try:
+            return _fts_search(words, code_type, limit)
+        except OperationalError:
+            # The index is gone (the database was swapped or migrated back)
+            reset_fts_available()
+    codes = HSNCode.objects.all()
+    for word in words:
+        codes = codes.filter(description__icontains=word)
+    if code_type:
+        codes = codes.filter(type=code_type)
+    return list(codes.order_by('code')[:limit])
+
+
+def _fts_search(words, code_type, limit):
+    query = ' AND '.join(f'"{word}"*' for word in words)
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s'
+    # Over-fetch when filtering by type afterwards so the limit still fills up
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [f'description : ({query})', limit * 4 if code_type else limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    by_id = HSNCode.objects.in_bulk(ids)
+    results = [by_id[pk] for pk in ids if pk in by_id and (not code_type or by_id[pk].type == code_type)]
+    return results[:limit]
+
+
+def search(text, selected_type='byCode', category=None, limit=50):
+    """Local equivalent of the GST portal's HSN search"""
+    code_type = CATEGORY_TYPES.get(category)
+    if selected_type == 'byCode':
+        return search_by_code(text, code_type, limit)
+    return search_by_description(text, code_type, limit)
+
+
+def upsert_codes(rows, batch_size=1000):
+    """
+    Insert or update (code, description) pairs in batches.
+
+    Returns (created, updated); unchanged codes are not written.
+    """
+    created = updated = 0
+    rows = list({code: description for code, description in rows if code}.items())
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        existing = HSNCode.objects.in_bulk([code for code, description in batch], field_name='code')
+        new, changed = [], []
+        now = timezone.now()
+        for code, description in batch:
+            current = existing.get(code)
+            if current is None:
+                new.append(HSNCode(code=code, description=description, type=code_type(code)))
+            elif current.description != description:
+                current.description = description
+                current.updated_at = now
+                changed.append(current)
+        HSNCode.objects.bulk_create(new)
+        HSNCode.objects.bulk_update(changed, ['description', 'updated_at'])
+        created += len(new)
+        updated += len(changed)
+    return created, updated
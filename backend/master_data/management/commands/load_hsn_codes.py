@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+import os
+from urllib.request import urlopen
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from master_data.hsn import upsert_codes
+
+
+BUNDLED_DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'hsn_codes.csv')
+
+# Column names accepted for the code and description, including those of the
+# CBIC HSN/SAC master workbook sheets saved as CSV
+CODE_COLUMNS = ['code', 'hsn_code', 'hsn_cd', 'sac_cd', 'c']
+DESCRIPTION_COLUMNS = ['description', 'hsn_description', 'sac_description', 'n']
+
+
+def _pick(row, names):
+    for name in names:
+        if row.get(name):
+            return str(row[name]).strip()
+    return ''
+
+
+def read_rows(text):
+    """(code, description) pairs from CSV text or a JSON list of objects"""
+    stripped = text.lstrip()
+    if stripped.startswith('[') or stripped.startswith('{'):
+        data = json.loads(stripped)
+        records = data.get('data', []) if isinstance(data, dict) else data
+    else:
+        records = csv.DictReader(io.StringIO(text))
+    for record in records:
+        row = {str(key).strip().lower(): value for key, value in record.items() if key}
+        code = ''.join(ch for ch in _pick(row, CODE_COLUMNS) if ch.isdigit())
+        description = _pick(row, DESCRIPTION_COLUMNS)
+        if code and description:
+            yield code, description
+
+
+class Command(BaseCommand):
+    help = 'Load HSN/SAC codes into the local master used by the HSN search (bundled dataset by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='CSV or JSON file with code and description columns')
+        parser.add_argument('--url', help='Download the dataset from this URL instead')
+
+    def handle(self, *args, **options):
+        if options['url']:
+            with urlopen(options['url'], timeout=60) as response:
+                text = response.read().decode('utf-8-sig')
+        else:
+            path = options['path'] or BUNDLED_DATASET
+            if not os.path.exists(path):
+                raise CommandError(f'No such file: {path}')
+            with open(path, encoding='utf-8-sig') as handle:
+                text = handle.read()
+
+        with transaction.atomic():
+            created, updated = upsert_codes(read_rows(text))
+        self.stdout.write(self.style.SUCCESS(f'Loaded HSN codes: {created} created, {updated} updated'))
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:11
+
+from django.db import migrations, models, OperationalError
+
+
+# Full-text index over hsn_codes kept in sync by triggers (SQLite only; other
+# databases fall back to LIKE searches in master_data.hsn)
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE hsn_codes_fts USING fts5(code, description, content='hsn_codes', content_rowid='id')",
+    """CREATE TRIGGER hsn_codes_fts_insert AFTER INSERT ON hsn_codes BEGIN
+        INSERT INTO hsn_codes_fts(rowid, code, description) VALUES (new.id, new.code, new.description);
+    END""",
+    """CREATE TRIGGER hsn_codes_fts_delete AFTER DELETE ON hsn_codes BEGIN
+        INSERT INTO hsn_codes_fts(hsn_codes_fts, rowid, code, description) VALUES ('delete', old.id, old.code, old.description);
+    END""",
+    """CREATE TRIGGER hsn_codes_fts_update AFTER UPDATE ON hsn_codes BEGIN
+        INSERT INTO hsn_codes_fts(hsn_codes_fts, rowid, code, description) VALUES ('delete', old.id, old.code, old.description);
+        INSERT INTO hsn_codes_fts(rowid, code, description) VALUES (new.id, new.code, new.description);
+    END""",
+]
+DROP_FTS_SQL = [
+    'DROP TRIGGER IF EXISTS hsn_codes_fts_insert',
+    'DROP TRIGGER IF EXISTS hsn_codes_fts_delete',
+    'DROP TRIGGER IF EXISTS hsn_codes_fts_update',
+    'DROP TABLE IF EXISTS hsn_codes_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+    except OperationalError:
+        # SQLite built without FTS5: leave description search on LIKE
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master_data', '0002_contact_gst_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HSNCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=8, unique=True)),
+                ('description', models.TextField()),
+                ('type', models.CharField(choices=[('goods', 'Goods (HSN)'), ('service', 'Service (SAC)')], max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'hsn_codes',
+                'ordering': ['code'],
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
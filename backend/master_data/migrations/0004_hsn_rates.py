@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:13
+
+import django.core.validators
+import datetime
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# The rates get_gst_rate_for_code used to hard-code, valid from the start of GST
+INITIAL_RATES = [
+    ('9401', '12', 'Seats/chairs'),
+    ('940140', '12', 'Seats convertible into beds'),
+    ('940161', '12', 'Other seats with wooden frames'),
+    ('940169', '12', 'Other seats with other frames'),
+    ('9402', '12', 'Medical/dental/surgical furniture'),
+    ('9403', '12', 'Other furniture'),
+    ('940310', '12', 'Metal furniture for offices'),
+    ('940320', '12', 'Other metal furniture'),
+    ('940330', '12', 'Wooden furniture for offices'),
+    ('940340', '12', 'Wooden furniture for kitchen'),
+    ('940350', '12', 'Wooden furniture for bedroom'),
+    ('940360', '12', 'Other wooden furniture'),
+    ('940370', '12', 'Furniture of plastics'),
+    ('9404', '12', 'Mattresses, pillows, etc.'),
+    ('4409', '5', 'Wood strips'),
+    ('4412', '12', 'Plywood'),
+    ('4418', '12', 'Wooden carpentry'),
+    ('8302', '18', 'Metal mountings/fittings'),
+    ('830242', '18', 'Furniture fittings'),
+    ('7318', '18', 'Screws, bolts, nuts'),
+    ('9997', '5', 'Transport services'),
+    ('9972', '18', 'Installation services'),
+    ('9983', '18', 'Design services'),
+    # Chapter defaults
+    ('94', '12', 'Furniture category'),
+    ('44', '12', 'Wood category'),
+    ('83', '18', 'Metal fittings'),
+    ('999', '18', 'Services'),
+]
+GST_START = datetime.date(2017, 7, 1)
+
+
+def load_initial_rates(apps, schema_editor):
+    HSNRate = apps.get_model('master_data', 'HSNRate')
+    HSNRate.objects.bulk_create([
+        HSNRate(prefix=prefix, rate=Decimal(rate), effective_from=GST_START, description=description)
+        for prefix, rate, description in INITIAL_RATES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master_data', '0003_hsn_codes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HSNRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=8)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('effective_from', models.DateField()),
+                ('effective_to', models.DateField(blank=True, null=True)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'hsn_rates',
+                'ordering': ['prefix', 'effective_from'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hsnrate',
+            constraint=models.UniqueConstraint(fields=('prefix', 'effective_from'), name='hsn_rate_prefix_from_uniq'),
+        ),
+        migrations.RunPython(load_initial_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:40
+
+import re
+from django.db import migrations, models, OperationalError
+
+
+# Full-text index over contacts kept in sync by triggers (SQLite only; other
+# databases fall back to LIKE searches in master_data.contact_search)
+FTS_SQL = [
+    "CREATE VIRTUAL TABLE contacts_fts USING fts5(name, email, mobile, gst_number, content='contacts', content_rowid='id')",
+    """CREATE TRIGGER contacts_fts_insert AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts(rowid, name, email, mobile, gst_number)
+        VALUES (new.id, new.name, new.email, new.mobile, new.gst_number);
+    END""",
+    """CREATE TRIGGER contacts_fts_delete AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, name, email, mobile, gst_number)
+        VALUES ('delete', old.id, old.name, old.email, old.mobile, old.gst_number);
+    END""",
+    """CREATE TRIGGER contacts_fts_update AFTER UPDATE OF name, email, mobile, gst_number ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, name, email, mobile, gst_number)
+        VALUES ('delete', old.id, old.name, old.email, old.mobile, old.gst_number);
+        INSERT INTO contacts_fts(rowid, name, email, mobile, gst_number)
+        VALUES (new.id, new.name, new.email, new.mobile, new.gst_number);
+    END""",
+    "INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')",
+]
+DROP_FTS_SQL = [
+    'DROP TRIGGER IF EXISTS contacts_fts_insert',
+    'DROP TRIGGER IF EXISTS contacts_fts_delete',
+    'DROP TRIGGER IF EXISTS contacts_fts_update',
+    'DROP TABLE IF EXISTS contacts_fts',
+]
+
+
+def fill_search_keys(apps, schema_editor):
+    Contact = apps.get_model('master_data', 'Contact')
+    contacts = list(Contact.objects.only('id', 'name'))
+    for contact in contacts:
+        contact.search_key = re.sub(r'[\W_]+', ' ', (contact.name or '').lower()).strip()
+    Contact.objects.bulk_update(contacts, ['search_key'], batch_size=1000)
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        for sql in FTS_SQL:
+            schema_editor.execute(sql)
+    except OperationalError:
+        # SQLite built without FTS5: leave token search on LIKE
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master_data', '0004_hsn_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='search_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['search_key'], name='contact_search_key_idx'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
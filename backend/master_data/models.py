@@ -1,8 +1,17 @@
+import re
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
 
 
+NON_ALPHANUMERIC = re.compile(r'[\W_]+')
+
+
+def normalize_search_key(text):
+    """Lowercase text with punctuation and runs of whitespace folded to single spaces"""
+    return NON_ALPHANUMERIC.sub(' ', (text or '').lower()).strip()
+
+
 class Contact(models.Model):
     """Contact Master - Customers and Vendors"""
     
@@ -24,15 +33,26 @@ class Contact(models.Model):
     profile_image = models.ImageField(upload_to='contact_images/', blank=True, null=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True, null=True, related_name='contact_profile')
     is_active = models.BooleanField(default=True)
+    search_key = models.CharField(max_length=255, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'contacts'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['search_key'], name='contact_search_key_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_type_display()})"
+    
+    def save(self, *args, **kwargs):
+        self.search_key = normalize_search_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'search_key'}
+        super().save(*args, **kwargs)
 
 
 class Product(models.Model):
@@ -133,3 +153,45 @@ class ChartOfAccount(models.Model):
         if self.parent:
             return f"{self.parent.get_full_name()} > {self.name}"
         return self.name
+
+
+class HSNCode(models.Model):
+    """HSN (goods) and SAC (services) code master, loaded by manage.py load_hsn_codes"""
+    
+    TYPE_CHOICES = [
+        ('goods', 'Goods (HSN)'),
+        ('service', 'Service (SAC)'),
+    ]
+    
+    code = models.CharField(max_length=8, unique=True)  # The unique index also serves code prefix searches
+    description = models.TextField()
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hsn_codes'
+        ordering = ['code']
+    
+    def __str__(self):
+        return f"{self.code} - {self.description[:50]}"
+
+
+class HSNRate(models.Model):
+    """GST rate for every HSN/SAC code starting with prefix, valid over a date range"""
+    
+    prefix = models.CharField(max_length=8)  # The longest matching prefix wins
+    rate = models.DecimalField(max_digits=5, decimal_places=2, validators=[MinValueValidator(0), MaxValueValidator(100)])
+    effective_from = models.DateField()
+    effective_to = models.DateField(blank=True, null=True)  # Open-ended when empty
+    description = models.CharField(max_length=255, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hsn_rates'
+        ordering = ['prefix', 'effective_from']
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'effective_from'], name='hsn_rate_prefix_from_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.prefix}* - {self.rate}% from {self.effective_from}"
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from .gst_rates import bump_rates_version
+from . import contact_search, hsn
+from .models import HSNRate
+
+
+@receiver([post_save, post_delete], sender=HSNRate)
+def invalidate_rate_tries(sender, **kwargs):
+    """Rebuild the in-process rate tries once the change is committed"""
+    transaction.on_commit(bump_rates_version)
+
+
+@receiver(post_migrate)
+def forget_fts_indexes(sender, **kwargs):
+    """Migrations may create or drop the FTS5 indexes, so look for them again on next use"""
+    hsn.reset_fts_available()
+    contact_search.reset_fts_available()
@@ -5,6 +5,7 @@ from . import hsn_views
 urlpatterns = [
     # Contact URLs
     path('contacts/', views.ContactListCreateView.as_view(), name='contact-list-create'),
+    path('contacts/autocomplete/', views.contact_autocomplete, name='contact-autocomplete'),
     path('contacts/<int:pk>/', views.ContactDetailView.as_view(), name='contact-detail'),
     
     # Product URLs
@@ -22,6 +23,7 @@ urlpatterns = [
     # HSN Search URLs
     path('hsn-search/', hsn_views.search_hsn_codes, name='hsn-search'),
     path('hsn-search/mock/', hsn_views.mock_hsn_search, name='hsn-search-mock'),
+    path('hsn-rates/resolve/', hsn_views.resolve_hsn_rates, name='hsn-rates-resolve'),
     
     # Summary
     path('summary/', views.master_data_summary, name='master-data-summary'),
@@ -3,14 +3,17 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from .contact_search import autocomplete
 from .models import Contact, Product, Tax, ChartOfAccount
+from reports.cache import cached_summary
+from reports.streaming import ExportMixin
 from .serializers import (
     ContactSerializer, ProductSerializer, TaxSerializer, ChartOfAccountSerializer,
     ContactListSerializer, ProductListSerializer, TaxListSerializer, ChartOfAccountListSerializer
 )
 
 
-class ContactListCreateView(generics.ListCreateAPIView):
+class ContactListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating contacts"""
     queryset = Contact.objects.filter(is_active=True)
     serializer_class = ContactSerializer
@@ -20,6 +23,16 @@ class ContactListCreateView(generics.ListCreateAPIView):
     search_fields = ['name', 'email', 'mobile']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    export_fields = [
+        ('name', 'Name'),
+        ('type', 'Type'),
+        ('email', 'Email'),
+        ('mobile', 'Mobile'),
+        ('city', 'City'),
+        ('state', 'State'),
+        ('gst_number', 'GST Number'),
+    ]
+    export_name = 'contacts'
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -39,7 +52,24 @@ class ContactDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def contact_autocomplete(request):
+    """
+    Typeahead search of active contacts: ?q=<text>&type=customer|vendor&limit=10.
+
+    Returns the top matches as id/name/type/gst_number only, name prefix
+    matches first, without a count or pagination (see contact_search).
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(autocomplete(request.GET.get('q', ''), request.GET.get('type'), limit))
+
+
+class ProductListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating products"""
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
@@ -49,6 +79,17 @@ class ProductListCreateView(generics.ListCreateAPIView):
     search_fields = ['name', 'hsn_code', 'category']
     ordering_fields = ['name', 'sales_price', 'created_at']
     ordering = ['name']
+    export_fields = [
+        ('name', 'Name'),
+        ('type', 'Type'),
+        ('category', 'Category'),
+        ('hsn_code', 'HSN Code'),
+        ('sales_price', 'Sales Price'),
+        ('purchase_price', 'Purchase Price'),
+        ('sale_tax_percent', 'Sale Tax %'),
+        ('purchase_tax_percent', 'Purchase Tax %'),
+    ]
+    export_name = 'products'
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -68,7 +109,7 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class TaxListCreateView(generics.ListCreateAPIView):
+class TaxListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating taxes"""
     queryset = Tax.objects.filter(is_active=True)
     serializer_class = TaxSerializer
@@ -78,6 +119,14 @@ class TaxListCreateView(generics.ListCreateAPIView):
     search_fields = ['name']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    export_fields = [
+        ('name', 'Name'),
+        ('computation_method', 'Computation'),
+        ('applicable_on', 'Applicable On'),
+        ('percentage_value', 'Percentage'),
+        ('fixed_value', 'Fixed Value'),
+    ]
+    export_name = 'taxes'
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -97,7 +146,7 @@ class TaxDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class ChartOfAccountListCreateView(generics.ListCreateAPIView):
+class ChartOfAccountListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating chart of accounts"""
     queryset = ChartOfAccount.objects.filter(is_active=True)
     serializer_class = ChartOfAccountSerializer
@@ -107,6 +156,14 @@ class ChartOfAccountListCreateView(generics.ListCreateAPIView):
     search_fields = ['name', 'code']
     ordering_fields = ['name', 'code', 'created_at']
     ordering = ['code', 'name']
+    export_fields = [
+        ('code', 'Code'),
+        ('name', 'Name'),
+        ('type', 'Type'),
+        ('opening_balance', 'Opening Balance'),
+        ('current_balance', 'Current Balance'),
+    ]
+    export_name = 'chart_of_accounts'
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -128,6 +185,7 @@ class ChartOfAccountDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_summary('master_data_summary')
 def master_data_summary(request):
     """Get summary of all master data"""
     summary = {
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from transactions.models import CustomerInvoice, VendorBill
+from .cache import ledger_version
+from .journal import amount
+
+
+BUCKETS = [
+    ('current', 'Current'),
+    ('days_1_30', '1-30'),
+    ('days_31_60', '31-60'),
+    ('days_61_90', '61-90'),
+    ('days_over_90', '90+'),
+]
+
+# Side -> (document model, contact field, document date field)
+SIDES = {
+    'receivable': (CustomerInvoice, 'customer', 'invoice_date'),
+    'payable': (VendorBill, 'vendor', 'bill_date'),
+}
+
+OPEN_STATUSES = ['pending', 'overdue']
+
+
+def bucket_filters(as_of_date):
+    """Bucket name -> due_date condition, by days past due on as_of_date"""
+    def days_ago(days):
+        return as_of_date - timedelta(days=days)
+
+    return {
+        'current': Q(due_date__gte=as_of_date),
+        'days_1_30': Q(due_date__lt=as_of_date, due_date__gte=days_ago(30)),
+        'days_31_60': Q(due_date__lt=days_ago(30), due_date__gte=days_ago(60)),
+        'days_61_90': Q(due_date__lt=days_ago(60), due_date__gte=days_ago(90)),
+        'days_over_90': Q(due_date__lt=days_ago(90)),
+    }
+
+
+def aging_rows(side, as_of_date):
+    """
+    Open balance per contact split into aging buckets, in one grouped query.
+
+    Covers open documents issued on or before as_of_date, aged by how many
+    days their due date lies before it. Balances are the documents' current
+    balance_due.
+    """
+    model, contact_field, date_field = SIDES[side]
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=15, decimal_places=2))
+    rows = model.objects.filter(
+        status__in=OPEN_STATUSES,
+        balance_due__gt=0,
+        **{f'{date_field}__lte': as_of_date}
+    ).values(f'{contact_field}_id', f'{contact_field}__name').annotate(
+        **{name: Coalesce(Sum('balance_due', filter=condition), zero)
+           for name, condition in bucket_filters(as_of_date).items()},
+        total=Sum('balance_due'),
+    ).order_by(f'{contact_field}__name', f'{contact_field}_id')
+
+    return [
+        {
+            'contact_id': row[f'{contact_field}_id'],
+            'contact_name': row[f'{contact_field}__name'],
+            **{name: amount(row[name]) for name, label in BUCKETS},
+            'total': amount(row['total']),
+        }
+        for row in rows
+    ]
+
+
+def aging_report(side, as_of_date):
+    """Aging rows and bucket totals for one side, cached per ledger version and as-of date"""
+    key = f'aging:{side}:{ledger_version()}:{as_of_date.isoformat()}'
+    report = cache.get(key)
+    if report is None:
+        rows = aging_rows(side, as_of_date)
+        totals = {name: sum((row[name] for row in rows), Decimal('0')) for name, label in BUCKETS}
+        totals['total'] = sum((row['total'] for row in rows), Decimal('0'))
+        report = {'rows': rows, 'totals': totals}
+        cache.set(key, report, settings.SUMMARY_CACHE_TIMEOUT)
+    return report
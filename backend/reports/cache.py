@@ -0,0 +1,132 @@
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+LEDGER_VERSION_KEY = 'ledger:version'
+PERIOD_VERSION_KEY = 'ledger:period:{:%Y-%m}'
+MASTER_VERSION_KEY = 'master:version'
+STATS_KEYS = {'hit': 'summary-cache:hits', 'miss': 'summary-cache:misses'}
+
+
+def _fresh_version():
+    # Millisecond clock, so a version recreated after eviction never reuses an old key
+    return int(time.time() * 1000)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def ledger_version():
+    """Current ledger version; changes whenever a document, payment or master record is written"""
+    return _version(LEDGER_VERSION_KEY)
+
+
+def bump_ledger_version():
+    """Invalidate every cached summary by moving to a new ledger version"""
+    _bump(LEDGER_VERSION_KEY)
+
+
+def master_version():
+    """Version of the contact and product master data; changes only when those are written"""
+    return _version(MASTER_VERSION_KEY)
+
+
+def bump_master_version():
+    _bump(MASTER_VERSION_KEY)
+
+
+def period_versions(months):
+    """
+    Version of each month's postings (months given as first days).
+
+    A month's version only changes when something dated in it is posted, so
+    results for past months stay valid across postings to other months.
+    """
+    keys = [PERIOD_VERSION_KEY.format(month) for month in months]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _fresh_version(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+def bump_period_versions(months):
+    """Invalidate results computed over the given months"""
+    for month in months:
+        _bump(PERIOD_VERSION_KEY.format(month))
+
+
+def _count(outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def cache_stats():
+    """Hit and miss counters of the summary cache"""
+    hits = cache.get(STATS_KEYS['hit']) or 0
+    misses = cache.get(STATS_KEYS['miss']) or 0
+    total = hits + misses
+    return {
+        'ledger_version': ledger_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0,
+    }
+
+
+def _audience(user):
+    """Users that see the same summary share one cache entry"""
+    if user.is_admin() or user.is_invoicing_user():
+        return 'staff'
+    contact = getattr(user, 'contact_profile', None)
+    return f'contact:{contact.pk}' if contact else f'user:{user.pk}'
+
+
+def cached_summary(name):
+    """
+    Serve a summary view from the cache until the ledger version changes.
+
+    Responses are keyed by view name, ledger version, audience and query
+    string, so no explicit invalidation is needed; old versions simply expire.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = 'summary:{}:{}:{}:{}'.format(
+                name, ledger_version(), _audience(request.user), request.META.get('QUERY_STRING', '')
+            )
+            data = cache.get(key)
+            if data is not None:
+                _count('hit')
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count('miss')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.SUMMARY_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
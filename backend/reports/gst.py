@@ -0,0 +1,144 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+from transactions.models import CustomerInvoiceItem, VendorBillItem
+from .cache import master_version, period_versions
+from .journal import ZERO, amount, month_start, next_month
+
+
+# side -> (line item model, document field, document date field, contact field)
+SIDES = {
+    'outward': (CustomerInvoiceItem, 'customer_invoice', 'invoice_date', 'customer'),
+    'inward': (VendorBillItem, 'vendor_bill', 'bill_date', 'vendor'),
+}
+
+MONEY = DecimalField(max_digits=15, decimal_places=2)
+
+HSN_COLUMNS = [
+    ('hsn_code', 'HSN/SAC'), ('tax_percent', 'Rate %'), ('quantity', 'Total Quantity'),
+    ('taxable_value', 'Taxable Value'), ('tax_amount', 'Tax Amount'), ('total_value', 'Total Value'),
+    ('document_count', 'Documents'),
+]
+RATE_COLUMNS = [
+    ('tax_percent', 'Rate %'), ('supply_type', 'Supply Type'), ('taxable_value', 'Taxable Value'),
+    ('tax_amount', 'Tax Amount'), ('total_value', 'Total Value'), ('document_count', 'Documents'),
+    ('line_count', 'Lines'),
+]
+
+
+def gst_groups(side, ranges):
+    """
+    Line item totals per (month, HSN code, tax rate, B2B or B2C) for documents dated in the ranges.
+
+    One grouped query over the side's line items joined to their document,
+    contact and product. Cancelled documents are left out and a line counts
+    as B2B when the contact has a GST number.
+    """
+    model, document_field, date_field, contact_field = SIDES[side]
+    dated = Q()
+    for start_date, end_date in ranges:
+        dated |= Q(**{f'{document_field}__{date_field}__range': [start_date, end_date]})
+    gst_number = f'{document_field}__{contact_field}__gst_number'
+    registered = Q(**{f'{gst_number}__isnull': False}) & ~Q(**{gst_number: ''})
+    return list(model.objects.filter(dated).exclude(**{f'{document_field}__status': 'cancelled'}).values(
+        month=TruncMonth(f'{document_field}__{date_field}'),
+        hsn=Coalesce('product__hsn_code', Value('')),
+        rate=F('tax_percent'),
+        b2b=Case(When(registered, then=Value(True)), default=Value(False), output_field=BooleanField()),
+    ).annotate(
+        quantity=Sum('quantity'),
+        taxable_value=Sum(ExpressionWrapper(F('total') - F('tax_amount'), output_field=MONEY)),
+        tax_amount=Sum('tax_amount'),
+        total_value=Sum('total'),
+        document_count=Count(document_field, distinct=True),
+        line_count=Count('id'),
+    ).order_by())
+
+
+def monthly_groups(side, start_date, end_date):
+    """
+    gst_groups for the range, with each closed calendar month cached on its own.
+
+    A whole month that has ended is cached without expiry, keyed on the
+    version of its postings and of the contact/product master data, so
+    filing-time reruns of past months read nothing from the database.
+    Everything not in the cache is fetched in one query.
+    """
+    this_month = month_start(timezone.now().date())
+    segments = []
+    month = month_start(start_date)
+    while month <= end_date:
+        first, last = max(month, start_date), min(next_month(month) - timedelta(days=1), end_date)
+        closed = first == month and last == next_month(month) - timedelta(days=1) and month < this_month
+        segments.append((month, first, last, closed))
+        month = next_month(month)
+
+    closed_months = [month for month, first, last, closed in segments if closed]
+    keys = {}
+    if closed_months:
+        version = master_version()
+        keys = {
+            month: f'gst:{side}:{month:%Y-%m}:{period_version}:{version}'
+            for month, period_version in zip(closed_months, period_versions(closed_months))
+        }
+    cached = cache.get_many(list(keys.values()))
+    groups = [group for key in keys.values() if key in cached for group in cached[key]]
+
+    missing = [(month, first, last) for month, first, last, closed in segments if keys.get(month) not in cached]
+    if missing:
+        fetched = gst_groups(side, [(first, last) for month, first, last in missing])
+        by_month = defaultdict(list)
+        for group in fetched:
+            by_month[group['month']].append(group)
+        cache.set_many({
+            keys[month]: by_month[month] for month, first, last in missing if month in keys
+        }, timeout=None)
+        groups += fetched
+    return groups
+
+
+AMOUNT_FIELDS = ['quantity', 'taxable_value', 'tax_amount', 'total_value']
+
+
+def _summarize(groups, key):
+    """Fold grouped rows into one row per key, adding up amounts and counts"""
+    rows = {}
+    for group in groups:
+        row = rows.setdefault(key(group), {
+            **dict.fromkeys(AMOUNT_FIELDS, ZERO), 'document_count': 0, 'line_count': 0,
+        })
+        for field in AMOUNT_FIELDS:
+            row[field] += amount(group[field])
+        # Documents with lines in several groups count once in each, as in the GSTR-1 HSN table
+        row['document_count'] += group['document_count']
+        row['line_count'] += group['line_count']
+    return rows
+
+
+def gst_summary(side, start_date, end_date):
+    """
+    HSN-wise and rate-wise (B2B/B2C) GST summaries of one side for a period.
+
+    Returns a dict with hsn_summary and rate_summary row lists and the
+    period's totals.
+    """
+    groups = monthly_groups(side, start_date, end_date)
+    hsn = _summarize(groups, lambda group: (group['hsn'], amount(group['rate'])))
+    rates = _summarize(groups, lambda group: (amount(group['rate']), 'B2B' if group['b2b'] else 'B2C'))
+    totals = {'taxable_value': ZERO, 'tax_amount': ZERO, 'total_value': ZERO, 'line_count': 0}
+    for row in hsn.values():
+        for field in totals:
+            totals[field] += row[field]
+    return {
+        'hsn_summary': [
+            {'hsn_code': code, 'tax_percent': rate, **values} for (code, rate), values in sorted(hsn.items())
+        ],
+        'rate_summary': [
+            {'tax_percent': rate, 'supply_type': supply_type, **values}
+            for (rate, supply_type), values in sorted(rates.items())
+        ],
+        'totals': totals,
+    }
@@ -0,0 +1,188 @@
+import json
+import os
+import traceback
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import F
+from django.http import HttpRequest, HttpResponseBase, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Job
+
+
+# Report views that can be queued with ?async=true or POST /api/reports/jobs/
+REPORT_VIEWS = [
+    'balance_sheet', 'profit_loss', 'partner_ledger', 'stock_report',
+    'receivables_aging', 'payables_aging', 'gst_summary_report', 'dashboard_summary',
+]
+
+RESULT_EXTENSIONS = {
+    'application/json': 'json',
+    'text/csv': 'csv',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+}
+
+
+class PermanentJobError(Exception):
+    """A failure retrying cannot fix, such as bad parameters"""
+
+
+def submit_job(kind, params=None, user=None, max_attempts=None):
+    """Queue a job of a kind listed in settings.JOB_HANDLERS"""
+    if kind not in settings.JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    return Job.objects.create(
+        kind=kind,
+        params=params or {},
+        created_by=user,
+        run_after=timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def set_progress(job, percent, message=''):
+    """Record how far a running job has got"""
+    Job.objects.filter(pk=job.pk).update(progress=max(0, min(100, int(percent))), progress_message=message[:255])
+
+
+def claim_jobs(worker, limit):
+    """
+    Mark up to limit due jobs as running for this worker and return their ids.
+
+    Each claim is an UPDATE conditional on the job still being queued, so
+    two workers polling at once never run the same job.
+    """
+    now = timezone.now()
+    candidates = list(Job.objects.filter(status='queued', run_after__lte=now).order_by(
+        'run_after', 'id'
+    ).values_list('id', flat=True)[:limit * 2])
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        if Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker, attempts=F('attempts') + 1,
+            started_at=now, progress=0, progress_message='',
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale(older_than):
+    """
+    Put jobs still marked running after older_than (their worker died) back on the queue.
+
+    Jobs that have used up max_attempts are marked failed instead, so a job
+    that must not run twice (max_attempts=1) is never started again.
+    Returns (requeued, failed) counts.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', started_at__lt=now - older_than)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='The worker stopped before the job finished', finished_at=now
+    )
+    requeued = stale.update(status='queued', run_after=now, worker='')
+    return requeued, failed
+
+
+def _result_chunks(result):
+    """(content type, iterable of bytes) for whatever a handler returned"""
+    if isinstance(result, HttpResponseBase):
+        if hasattr(result, 'render'):
+            result.render()  # Also sets the content type of DRF responses
+        content_type = result['Content-Type'].split(';')[0]
+        if result.status_code >= 400:
+            body = b'' if result.streaming else result.content[:500]
+            raise PermanentJobError(f'HTTP {result.status_code}: {body.decode(errors="replace")}')
+        if result.streaming:
+            return content_type, result.streaming_content
+        return content_type, [result.content]
+    return 'application/json', [json.dumps(result, cls=DjangoJSONEncoder).encode()]
+
+
+def _store_result(job, result):
+    content_type, chunks = _result_chunks(result)
+    os.makedirs(settings.JOB_RESULTS_DIR, exist_ok=True)
+    name = f'{job.pk}.{RESULT_EXTENSIONS.get(content_type, "bin")}'
+    with open(os.path.join(settings.JOB_RESULTS_DIR, name), 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    return name, content_type
+
+
+def run_job(job_id):
+    """
+    Run one claimed job and store its result on disk.
+
+    A failed job goes back on the queue after JOB_RETRY_BACKOFF seconds,
+    doubled for every attempt made, until it has used up max_attempts.
+    """
+    close_old_connections()
+    job = Job.objects.select_related('created_by').get(pk=job_id)
+    if job.attempts > job.max_attempts:
+        Job.objects.filter(pk=job_id).update(
+            status='failed', error='No attempts left', finished_at=timezone.now()
+        )
+        return False
+    try:
+        handler = import_string(settings.JOB_HANDLERS[job.kind])
+        result_path, content_type = _store_result(job, handler(job, **job.params))
+    except Exception as exc:
+        error = ''.join(traceback.format_exception(exc))
+        now = timezone.now()
+        if job.attempts < job.max_attempts and not isinstance(exc, PermanentJobError):
+            delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job_id).update(
+                status='queued', run_after=now + timedelta(seconds=delay), error=error, worker=''
+            )
+        else:
+            Job.objects.filter(pk=job_id).update(status='failed', error=error, finished_at=now)
+        return False
+    finally:
+        close_old_connections()
+
+    Job.objects.filter(pk=job_id).update(
+        status='succeeded', progress=100, result_path=result_path, result_content_type=content_type,
+        error=None, finished_at=timezone.now(),
+    )
+    return True
+
+
+def run_report(job, report, query=''):
+    """Job handler: render a reports.views endpoint as the job's owner would see it"""
+    from . import views
+
+    if report not in REPORT_VIEWS:
+        raise PermanentJobError(f'Unknown report {report!r}')
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(query)
+    request.META['QUERY_STRING'] = query
+    request.user = job.created_by
+    return getattr(views, report)(request)
+
+
+def async_report(name):
+    """
+    Let a report view be queued with ?async=true.
+
+    The job re-runs the view with the same query string in a worker, and the
+    response points at the job to poll. Place below @permission_classes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.GET.get('async') != 'true':
+                return view(request, *args, **kwargs)
+            query = request.GET.copy()
+            query.pop('async')
+            job = submit_job('report', {'report': name, 'query': query.urlencode()}, request.user)
+            from .serializers import JobSerializer
+            return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+        return wrapper
+    return decorator
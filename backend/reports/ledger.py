@@ -0,0 +1,122 @@
+from decimal import Decimal
+from django.db import connection
+from django.db.models import (
+    Case, CharField, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce, Concat
+from transactions.models import CustomerInvoice, VendorBill, Payment, PaymentAllocation
+from .journal import amount
+from .models import JournalLine
+
+
+COLUMNS = ['date', 'seq', 'transaction_type', 'reference', 'description', 'debit', 'credit', 'source_id']
+
+MONEY = DecimalField(max_digits=15, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+def opening_balance(contact_id, start_date):
+    """
+    Partner balance before start_date (receivable positive, payable negative).
+
+    One aggregate over the contact's posted receivable and payable journal
+    lines, which carry exactly the invoices, bills and payments the ledger
+    lists.
+    """
+    totals = JournalLine.objects.filter(contact_id=contact_id, entry_date__lt=start_date).aggregate(
+        debit=Coalesce(Sum('debit'), ZERO), credit=Coalesce(Sum('credit'), ZERO)
+    )
+    return amount(totals['debit'] - totals['credit'])
+
+
+def _text(value):
+    return Value(value, output_field=CharField())
+
+
+def _branches(contact_id, start_date, end_date):
+    """One queryset per kind of ledger row, all selecting the same columns in the same order"""
+    def columns(queryset, **values):
+        return queryset.annotate(**{f'row_{name}': values[name] for name in COLUMNS}).values_list(
+            *[f'row_{name}' for name in COLUMNS]
+        ).order_by()
+
+    invoices = columns(
+        CustomerInvoice.objects.filter(customer_id=contact_id, invoice_date__range=[start_date, end_date])
+        .exclude(status='cancelled'),
+        date=F('invoice_date'), seq=Value(1, output_field=IntegerField()), transaction_type=_text('Invoice'),
+        reference=F('invoice_number'), description=Concat(_text('Invoice #'), 'invoice_number'),
+        debit=F('grand_total'), credit=ZERO, source_id=F('id'),
+    )
+    bills = columns(
+        VendorBill.objects.filter(vendor_id=contact_id, bill_date__range=[start_date, end_date])
+        .exclude(status='cancelled'),
+        date=F('bill_date'), seq=Value(1, output_field=IntegerField()), transaction_type=_text('Bill'),
+        reference=F('bill_number'), description=Concat(_text('Bill #'), 'bill_number'),
+        debit=ZERO, credit=F('grand_total'), source_id=F('id'),
+    )
+
+    is_vendor_payment = Q(payment__payment_type='vendor_payment')
+    allocations = columns(
+        PaymentAllocation.objects.filter(
+            payment__contact_id=contact_id, payment__payment_date__range=[start_date, end_date]
+        ),
+        date=F('payment__payment_date'), seq=Value(2, output_field=IntegerField()),
+        transaction_type=_text('Payment'), reference=F('payment__payment_number'),
+        description=Concat(
+            _text('Payment for '),
+            Coalesce('customer_invoice__invoice_number', 'vendor_bill__bill_number', output_field=CharField()),
+        ),
+        debit=Case(When(is_vendor_payment, then=F('allocated_amount')), default=ZERO, output_field=MONEY),
+        credit=Case(When(is_vendor_payment, then=ZERO), default=F('allocated_amount'), output_field=MONEY),
+        source_id=F('payment_id'),
+    )
+
+    allocated = PaymentAllocation.objects.filter(payment=OuterRef('pk')).order_by().values('payment').annotate(
+        total=Sum('allocated_amount')
+    ).values('total')
+    unallocated = F('amount') - Coalesce(Subquery(allocated, output_field=MONEY), ZERO)
+    payments = columns(
+        Payment.objects.filter(contact_id=contact_id, payment_date__range=[start_date, end_date])
+        .annotate(unallocated=unallocated).filter(unallocated__gt=0),
+        date=F('payment_date'), seq=Value(3, output_field=IntegerField()), transaction_type=_text('Payment'),
+        reference=F('payment_number'), description=_text('Unallocated payment'),
+        debit=Case(When(payment_type='vendor_payment', then=F('unallocated')), default=ZERO, output_field=MONEY),
+        credit=Case(When(payment_type='vendor_payment', then=ZERO), default=F('unallocated'), output_field=MONEY),
+        source_id=F('id'),
+    )
+    return invoices, bills, allocations, payments
+
+
+def ledger_rows(contact_id, start_date, end_date, opening=Decimal('0'), chunk_size=500):
+    """
+    Yield the partner's invoices, bills and payments between the dates in date order.
+
+    The branches are combined with UNION ALL and the running balance comes
+    from a window SUM over the merged, ordered rows, so the database does the
+    merge and the rows are fetched in chunks rather than loaded at once.
+    """
+    invoices, bills, allocations, payments = _branches(contact_id, start_date, end_date)
+    union_sql, params = invoices.union(bills, allocations, payments, all=True).query.sql_with_params()
+    order = 'row_date, row_seq, row_reference, row_source_id'
+    sql = (
+        f'SELECT {", ".join(f"row_{name}" for name in COLUMNS)}, '
+        f'SUM(row_debit - row_credit) OVER (ORDER BY {order} ROWS UNBOUNDED PRECEDING) '
+        f'FROM ({union_sql}) AS ledger ORDER BY {order}'
+    )
+    date_field = CustomerInvoice._meta.get_field('invoice_date')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for entry_date, seq, transaction_type, reference, description, debit, credit, source_id, running in rows:
+                yield {
+                    'date': date_field.to_python(entry_date),
+                    'transaction_type': transaction_type,
+                    'reference': reference,
+                    'description': description,
+                    'debit': amount(debit),
+                    'credit': amount(credit),
+                    'running_balance': amount(opening + amount(running)),
+                }
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from reports.journal import rebuild_journal
+
+
+class Command(BaseCommand):
+    help = 'Re-post all invoices, bills and payments to the journal and recompute account balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_journal(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Posted {written} journal entries'))
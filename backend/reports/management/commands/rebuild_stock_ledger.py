@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from reports.stock import rebuild_stock_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stock movements and balances from existing vendor bills and customer invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        written = rebuild_stock_ledger(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Posted {written} stock movements'))
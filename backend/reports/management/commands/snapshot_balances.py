@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from reports.journal import snapshot_schedule, take_snapshots
+from reports.models import JournalLine
+
+
+class Command(BaseCommand):
+    help = 'Backfill or refresh account balance snapshots used by as-of-date balance sheets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequency', choices=['monthly', 'daily'], default='monthly')
+        parser.add_argument('--start', help='First date to consider (YYYY-MM-DD), defaults to the earliest posting')
+        parser.add_argument('--end', help='Last date to snapshot (YYYY-MM-DD), defaults to yesterday')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date()
+        else:
+            start_date = JournalLine.objects.aggregate(first=Min('entry_date'))['first']
+        if options['end']:
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date()
+        else:
+            end_date = timezone.now().date() - timedelta(days=1)
+
+        if start_date is None:
+            self.stdout.write('Nothing has been posted yet')
+            return
+
+        written = take_snapshots(snapshot_schedule(start_date, end_date, options['frequency']))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} balance snapshots'))
@@ -0,0 +1,113 @@
+from decimal import Decimal
+from django.db.models import Count, Sum, Q
+from master_data.models import Contact, Product
+from transactions.models import (
+    CustomerInvoice, VendorBill, Payment, SalesOrder, PurchaseOrder
+)
+from .models import StockBalance
+
+
+# Statuses of documents with a balance still to settle; the overdue sweep moves pending ones past due
+OUTSTANDING_STATUSES = ['pending', 'overdue']
+
+
+ZERO = Decimal('0')
+
+LOW_STOCK_QUANTITY = 10
+
+
+def _totals(row):
+    """Replace the NULL sums of empty tables with zero"""
+    return {key: ZERO if value is None else value for key, value in row.items()}
+
+
+def document_metrics(queryset):
+    """
+    Counts and amounts of customer invoices or vendor bills by status, in one query.
+
+    pending_amount is everything still outstanding, overdue documents
+    included; overdue_amount is the past-due part of it.
+    """
+    return _totals(queryset.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        paid=Count('id', filter=Q(status='paid')),
+        overdue=Count('id', filter=Q(status='overdue')),
+        total_amount=Sum('grand_total'),
+        paid_amount=Sum('grand_total', filter=Q(status='paid')),
+        pending_amount=Sum('balance_due', filter=Q(status__in=OUTSTANDING_STATUSES)),
+        overdue_amount=Sum('balance_due', filter=Q(status='overdue')),
+    ))
+
+
+def invoice_metrics(customer=None):
+    invoices = CustomerInvoice.objects.all()
+    if customer is not None:
+        invoices = invoices.filter(customer=customer)
+    return document_metrics(invoices)
+
+
+def bill_metrics(vendor=None):
+    bills = VendorBill.objects.all()
+    if vendor is not None:
+        bills = bills.filter(vendor=vendor)
+    return document_metrics(bills)
+
+
+def order_metrics(model):
+    """Sales or purchase order counts per status, in one query"""
+    statuses = [value for value, label in model.STATUS_CHOICES]
+    return model.objects.aggregate(
+        total=Count('id'),
+        **{value: Count('id', filter=Q(status=value)) for value in statuses}
+    )
+
+
+def sales_order_metrics():
+    return order_metrics(SalesOrder)
+
+
+def purchase_order_metrics():
+    return order_metrics(PurchaseOrder)
+
+
+def payment_metrics():
+    """Payment counts and amounts by direction, in one query"""
+    return _totals(Payment.objects.aggregate(
+        total=Count('id'),
+        customer_payments=Count('id', filter=Q(payment_type='customer_payment')),
+        vendor_payments=Count('id', filter=Q(payment_type='vendor_payment')),
+        total_amount=Sum('amount'),
+        received_amount=Sum('amount', filter=Q(payment_type='customer_payment')),
+        paid_amount=Sum('amount', filter=Q(payment_type='vendor_payment')),
+    ))
+
+
+def contact_metrics():
+    """Customer and vendor counts, overall and active only, in one query"""
+    customer = Q(type__in=['customer', 'both'])
+    vendor = Q(type__in=['vendor', 'both'])
+    return Contact.objects.aggregate(
+        customers=Count('id', filter=customer),
+        vendors=Count('id', filter=vendor),
+        active_customers=Count('id', filter=customer & Q(is_active=True)),
+        active_vendors=Count('id', filter=vendor & Q(is_active=True)),
+    )
+
+
+def product_metrics():
+    """Active product count plus stocked and low stock product counts"""
+    stock = StockBalance.objects.aggregate(
+        stocked=Count('id'),
+        low_stock=Count('id', filter=Q(current_quantity__lt=LOW_STOCK_QUANTITY)),
+    )
+    stock['active'] = Product.objects.filter(is_active=True).count()
+    return stock
+
+
+def recent_pending_invoices(limit=3):
+    return CustomerInvoice.objects.filter(status__in=OUTSTANDING_STATUSES).select_related('customer').order_by('-invoice_date')[:limit]
+
+
+def recent_payments(limit=3):
+    return Payment.objects.select_related('contact').order_by('-payment_date')[:limit]
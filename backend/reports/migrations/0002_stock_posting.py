@@ -0,0 +1,92 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:35
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_stock_ledger(apps, schema_editor):
+    """Post existing vendor bills and customer invoices to the stock ledger"""
+    StockMovement = apps.get_model('reports', 'StockMovement')
+    StockBalance = apps.get_model('reports', 'StockBalance')
+    VendorBillItem = apps.get_model('transactions', 'VendorBillItem')
+    CustomerInvoiceItem = apps.get_model('transactions', 'CustomerInvoiceItem')
+    Product = apps.get_model('master_data', 'Product')
+    two_places = Decimal('0.01')
+
+    totals = {}
+    movements = []
+    sources = [
+        ('vendor_bill', 'purchase', VendorBillItem.objects.exclude(vendor_bill__status='cancelled').values_list(
+            'vendor_bill_id', 'product_id', 'quantity', 'unit_price',
+            'vendor_bill__bill_date', 'vendor_bill__bill_number')),
+        ('customer_invoice', 'sale', CustomerInvoiceItem.objects.exclude(customer_invoice__status='cancelled').values_list(
+            'customer_invoice_id', 'product_id', 'quantity', 'unit_price',
+            'customer_invoice__invoice_date', 'customer_invoice__invoice_number')),
+    ]
+    for source_type, movement_type, items in sources:
+        for source_id, product_id, quantity, price, movement_date, number in items.iterator():
+            value = (quantity * price).quantize(two_places)
+            purchased, purchased_value, sold = totals.get(product_id, (0, 0, 0))
+            if source_type == 'vendor_bill':
+                totals[product_id] = (purchased + quantity, purchased_value + value, sold)
+            else:
+                totals[product_id] = (purchased, purchased_value, sold + quantity)
+            movements.append(StockMovement(
+                product_id=product_id, movement_type=movement_type, quantity=quantity,
+                unit_price=price, total_value=value, reference_document=number,
+                movement_date=movement_date, source_type=source_type, source_id=source_id,
+            ))
+            if len(movements) >= 2000:
+                StockMovement.objects.bulk_create(movements)
+                movements = []
+    StockMovement.objects.bulk_create(movements)
+
+    # Without purchases to average, cost falls back to the purchase price, as in reports.stock.average_cost
+    prices = dict(Product.objects.filter(id__in=list(totals)).values_list('id', 'purchase_price'))
+    for product_id, (purchased, purchased_value, sold) in totals.items():
+        balance, _ = StockBalance.objects.get_or_create(product_id=product_id)
+        balance.purchased_quantity = purchased
+        balance.purchased_value = purchased_value
+        balance.sold_quantity = sold
+        balance.current_quantity = (
+            balance.opening_quantity + purchased - sold + balance.adjusted_quantity
+        )
+        average_cost = purchased_value / purchased if purchased > 0 else Decimal(str(prices.get(product_id) or 0))
+        balance.average_cost = average_cost.quantize(two_places)
+        balance.stock_value = (balance.current_quantity * average_cost).quantize(two_places)
+        balance.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('transactions', '0003_payment_notes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockbalance',
+            name='purchased_value',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=15),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='source_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='source_type',
+            field=models.CharField(blank=True, choices=[('vendor_bill', 'Vendor Bill'), ('customer_invoice', 'Customer Invoice')], max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['source_type', 'source_id'], name='stock_mov_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['movement_date'], name='stock_mov_date_idx'),
+        ),
+        migrations.RunPython(backfill_stock_ledger, migrations.RunPython.noop),
+    ]
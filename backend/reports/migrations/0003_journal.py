@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('master_data', '0002_contact_gst_number'),
+        ('reports', '0002_stock_posting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+            options={
+                'db_table': 'account_period_balances',
+                'ordering': ['period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('description', models.CharField(blank=True, max_length=255, null=True)),
+                ('source_type', models.CharField(choices=[('customer_invoice', 'Customer Invoice'), ('vendor_bill', 'Vendor Bill'), ('payment', 'Payment')], max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'journal_entries',
+                'ordering': ['-entry_date', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JournalLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_date', models.DateField()),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='journal_lines', to='master_data.chartofaccount')),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='journal_lines', to='master_data.contact')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='reports.journalentry')),
+            ],
+            options={
+                'db_table': 'journal_lines',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(fields=('source_type', 'source_id'), name='journal_entry_source_uniq'),
+        ),
+        migrations.AddField(
+            model_name='accountperiodbalance',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='master_data.chartofaccount'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['entry_date', 'account'], name='journal_line_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['account', 'entry_date'], name='journal_line_account_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountperiodbalance',
+            index=models.Index(fields=['period', 'account'], name='account_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodbalance',
+            constraint=models.UniqueConstraint(fields=('account', 'period'), name='account_period_uniq'),
+        ),
+    ]
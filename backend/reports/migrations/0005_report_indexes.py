@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_balance_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['current_quantity'], name='stock_bal_quantity_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalline',
+            index=models.Index(fields=['contact', 'entry_date', 'debit', 'credit'], name='journal_line_contact_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator
-from master_data.models import Product, ChartOfAccount
+from accounts.models import User
+from master_data.models import Product, ChartOfAccount, Contact
 from transactions.models import CustomerInvoice, VendorBill, PurchaseOrder, SalesOrder
 
 
@@ -14,6 +15,11 @@ class StockMovement(models.Model):
         ('opening', 'Opening Stock'),
     ]
     
+    SOURCE_TYPE_CHOICES = [
+        ('vendor_bill', 'Vendor Bill'),
+        ('customer_invoice', 'Customer Invoice'),
+    ]
+    
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPE_CHOICES)
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
@@ -22,11 +28,17 @@ class StockMovement(models.Model):
     reference_document = models.CharField(max_length=100, blank=True, null=True)  # PO, SO, Invoice, Bill number
     movement_date = models.DateField()
     notes = models.TextField(blank=True, null=True)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPE_CHOICES, blank=True, null=True)
+    source_id = models.PositiveBigIntegerField(blank=True, null=True)  # Bill or invoice posting this movement
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'stock_movements'
         ordering = ['-movement_date', '-created_at']
+        indexes = [
+            models.Index(fields=['source_type', 'source_id'], name='stock_mov_source_idx'),
+            models.Index(fields=['movement_date'], name='stock_mov_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.movement_type} - {self.quantity}"
@@ -39,6 +51,7 @@ class StockBalance(models.Model):
     opening_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     purchased_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     sold_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    purchased_value = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     adjusted_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     current_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     average_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -47,6 +60,9 @@ class StockBalance(models.Model):
     
     class Meta:
         db_table = 'stock_balances'
+        indexes = [
+            models.Index(fields=['current_quantity'], name='stock_bal_quantity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.current_quantity} units"
@@ -62,3 +78,137 @@ class StockBalance(models.Model):
         # Calculate stock value
         self.stock_value = self.current_quantity * self.average_cost
         super().save(*args, **kwargs)
+
+
+class JournalEntry(models.Model):
+    """Double-entry journal entry posted from an invoice, bill or payment"""
+    
+    SOURCE_TYPE_CHOICES = [
+        ('customer_invoice', 'Customer Invoice'),
+        ('vendor_bill', 'Vendor Bill'),
+        ('payment', 'Payment'),
+    ]
+    
+    entry_date = models.DateField()
+    reference = models.CharField(max_length=100, blank=True, null=True)
+    description = models.CharField(max_length=255, blank=True, null=True)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPE_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'journal_entries'
+        ordering = ['-entry_date', '-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['source_type', 'source_id'], name='journal_entry_source_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.reference} - {self.entry_date}"
+
+
+class JournalLine(models.Model):
+    """Debit or credit line of a journal entry"""
+    
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(ChartOfAccount, on_delete=models.PROTECT, related_name='journal_lines')
+    contact = models.ForeignKey(Contact, on_delete=models.SET_NULL, blank=True, null=True, related_name='journal_lines')
+    entry_date = models.DateField()  # Copied from the entry so date range scans stay on one table
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'journal_lines'
+        indexes = [
+            models.Index(fields=['entry_date', 'account'], name='journal_line_date_idx'),
+            models.Index(fields=['account', 'entry_date'], name='journal_line_account_idx'),
+            # Partner opening balances
+            models.Index(fields=['contact', 'entry_date', 'debit', 'credit'], name='journal_line_contact_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account.name} Dr {self.debit} Cr {self.credit}"
+
+
+class AccountPeriodBalance(models.Model):
+    """Monthly debit and credit totals per account, kept up to date by journal posting"""
+    
+    account = models.ForeignKey(ChartOfAccount, on_delete=models.CASCADE, related_name='period_balances')
+    period = models.DateField()  # First day of the month
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'account_period_balances'
+        ordering = ['period']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'period'], name='account_period_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'account'], name='account_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account.name} - {self.period:%Y-%m}"
+
+
+class BalanceSnapshot(models.Model):
+    """Cumulative debit and credit totals per account at the close of a day"""
+    
+    snapshot_date = models.DateField()
+    account = models.ForeignKey(ChartOfAccount, on_delete=models.CASCADE, related_name='balance_snapshots')
+    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'balance_snapshots'
+        ordering = ['-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot_date', 'account'], name='balance_snapshot_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['account', 'snapshot_date'], name='balance_snapshot_account_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account.name} - {self.snapshot_date}"
+
+
+class Job(models.Model):
+    """Background job queued from a request and run by manage.py run_workers"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)  # Key of settings.JOB_HANDLERS
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField()  # Not picked up before this; pushed back between retries
+    progress = models.PositiveSmallIntegerField(default=0)  # Percent
+    progress_message = models.CharField(max_length=255, blank=True, default='')
+    result_path = models.CharField(max_length=255, blank=True, default='')  # Under settings.JOB_RESULTS_DIR
+    result_content_type = models.CharField(max_length=100, blank=True, default='')
+    error = models.TextField(blank=True, null=True)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.status}"
@@ -0,0 +1,175 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from master_data.models import ChartOfAccount
+from .cache import period_versions
+from .journal import ZERO, amount, month_start, natural_balance, next_month
+from .models import AccountPeriodBalance, JournalLine
+
+
+GROUP_BY = ['month', 'quarter', 'year']
+MONTHS_PER_PERIOD = {'month': 1, 'quarter': 3, 'year': 12}
+
+
+def _shift_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def period_start(value, group_by):
+    """First day of the month, fiscal quarter or fiscal year containing value"""
+    size = MONTHS_PER_PERIOD[group_by]
+    offset = (value.month - getattr(settings, 'FISCAL_YEAR_START_MONTH', 4)) % 12
+    return _shift_months(value, -(offset % size))
+
+
+def period_label(start, group_by):
+    if group_by == 'month':
+        return f'{start:%b %Y}'
+    fiscal_start = period_start(start, 'year')
+    year = f'FY{fiscal_start.year}-{(fiscal_start.year + 1) % 100:02d}'
+    if group_by == 'year':
+        return year
+    return f'Q{(start.month - fiscal_start.month) % 12 // 3 + 1} {year}'
+
+
+def periods(start_date, end_date, group_by):
+    """Periods overlapping the range as (key, label, first day, last day), clipped to the range"""
+    result = []
+    start = period_start(start_date, group_by)
+    while start <= end_date:
+        following = _shift_months(start, MONTHS_PER_PERIOD[group_by])
+        result.append((
+            f'{start:%Y-%m}', period_label(start, group_by),
+            max(start, start_date), min(following - timedelta(days=1), end_date),
+        ))
+        start = following
+    return result
+
+
+def monthly_totals(start_date, end_date):
+    """
+    Debit and credit totals per month and account for postings in the range.
+
+    Two grouped queries whatever the number of months: whole months come
+    from AccountPeriodBalance, and the partial months at either end of the
+    range from journal lines truncated to the month. Returns
+    {month: {account_id: [debit, credit]}}.
+    """
+    totals = defaultdict(lambda: defaultdict(lambda: [ZERO, ZERO]))
+
+    def add(month, account_id, debit, credit):
+        totals[month][account_id][0] += amount(debit)
+        totals[month][account_id][1] += amount(credit)
+
+    first_full = start_date if start_date.day == 1 else next_month(start_date)
+    full_end = month_start(end_date + timedelta(days=1))  # Months starting before this are fully covered
+
+    partial = Q()
+    if first_full >= full_end:
+        partial = Q(entry_date__range=[start_date, end_date])
+    else:
+        for row in AccountPeriodBalance.objects.filter(period__gte=first_full, period__lt=full_end).values_list(
+            'period', 'account_id', 'debit', 'credit'
+        ):
+            add(*row)
+        if start_date < first_full:
+            partial |= Q(entry_date__range=[start_date, first_full - timedelta(days=1)])
+        if full_end <= end_date:
+            partial |= Q(entry_date__range=[full_end, end_date])
+
+    if partial:
+        rows = JournalLine.objects.filter(partial).annotate(month=TruncMonth('entry_date')).values(
+            'month', 'account_id'
+        ).annotate(total_debit=Sum('debit'), total_credit=Sum('credit')).order_by()
+        for row in rows:
+            add(row['month'], row['account_id'], row['total_debit'], row['total_credit'])
+    return totals
+
+
+def _period_cache_key(first, last):
+    months = []
+    month = month_start(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return 'periods:{}:{}:{}'.format(first, last, '.'.join(str(version) for version in period_versions(months)))
+
+
+def period_totals(start_date, end_date, group_by):
+    """
+    Debit and credit totals per account for each period of the range.
+
+    Periods that ended before the current month are cached without expiry,
+    keyed on the versions of their months, so they are read from the
+    database again only after a posting dated inside them. Returns
+    (periods, {period key: {account_id: [debit, credit]}}).
+    """
+    spans = periods(start_date, end_date, group_by)
+    this_month = month_start(timezone.now().date())
+    closed_keys = {key: _period_cache_key(first, last) for key, label, first, last in spans if last < this_month}
+    cached = cache.get_many(list(closed_keys.values()))
+    results = {key: cached[cache_key] for key, cache_key in closed_keys.items() if cache_key in cached}
+
+    missing = [span for span in spans if span[0] not in results]
+    if missing:
+        by_month = monthly_totals(missing[0][2], missing[-1][3])
+        fresh = {}
+        for key, label, first, last in missing:
+            bucket = defaultdict(lambda: [ZERO, ZERO])
+            for month, accounts in by_month.items():
+                if month_start(first) <= month <= last:
+                    for account_id, (debit, credit) in accounts.items():
+                        bucket[account_id][0] += debit
+                        bucket[account_id][1] += credit
+            results[key] = dict(bucket)
+            if key in closed_keys:
+                fresh[closed_keys[key]] = results[key]
+        cache.set_many(fresh, timeout=None)
+    return spans, results
+
+
+def profit_loss_periods(start_date, end_date, group_by):
+    """
+    Income and expense accounts with one amount column per period.
+
+    Returns (periods, rows, totals) where each row holds the account name and
+    type, an amount under every period key and a 'total'; totals maps
+    total_income, total_expenses and net_profit to the same shape.
+    """
+    spans, totals = period_totals(start_date, end_date, group_by)
+    keys = [span[0] for span in spans]
+    accounts = ChartOfAccount.objects.filter(is_active=True, type__in=['income', 'expense']).order_by('code', 'name')
+
+    rows = []
+    section_totals = {}
+    for account_type, total_label in [('income', 'Total Income'), ('expense', 'Total Expenses')]:
+        section = dict.fromkeys(keys, ZERO)
+        for account in accounts:
+            if account.type != account_type:
+                continue
+            amounts = {
+                key: natural_balance(account.type, *totals[key].get(account.id, (ZERO, ZERO))) for key in keys
+            }
+            if not any(amounts.values()):
+                continue
+            for key in keys:
+                section[key] += amounts[key]
+            rows.append({'account_name': account.name, 'account_type': account_type, **amounts,
+                         'total': sum(amounts.values(), ZERO), 'is_total': False})
+        rows.append({'account_name': total_label, 'account_type': account_type, **section,
+                     'total': sum(section.values(), ZERO), 'is_total': True})
+        section_totals[account_type] = section
+
+    net = {key: section_totals['income'][key] - section_totals['expense'][key] for key in keys}
+    rows.append({'account_name': 'Net Profit / Loss', 'account_type': 'net_profit', **net,
+                 'total': sum(net.values(), ZERO), 'is_total': True})
+    return spans, rows, {
+        'total_income': section_totals['income'],
+        'total_expenses': section_totals['expense'],
+        'net_profit': net,
+    }
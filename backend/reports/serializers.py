@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import StockMovement, StockBalance
+from django.urls import reverse
+from .models import StockMovement, StockBalance, Job
 from master_data.serializers import ProductListSerializer
 
 
@@ -24,9 +25,9 @@ class StockBalanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockBalance
         fields = ['id', 'product', 'product_name', 'opening_quantity', 'purchased_quantity',
-                 'sold_quantity', 'adjusted_quantity', 'current_quantity', 'average_cost',
-                 'stock_value', 'last_updated']
-        read_only_fields = ['id', 'current_quantity', 'stock_value', 'last_updated']
+                 'purchased_value', 'sold_quantity', 'adjusted_quantity', 'current_quantity',
+                 'average_cost', 'stock_value', 'last_updated']
+        read_only_fields = ['id', 'purchased_value', 'current_quantity', 'stock_value', 'last_updated']
 
 
 class BalanceSheetSerializer(serializers.Serializer):
@@ -66,3 +67,32 @@ class StockReportSerializer(serializers.Serializer):
     current_quantity = serializers.DecimalField(max_digits=10, decimal_places=2)
     average_cost = serializers.DecimalField(max_digits=10, decimal_places=2)
     stock_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background jobs, with where to poll and fetch the result"""
+    error = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'params', 'status', 'progress', 'progress_message', 'attempts',
+                 'max_attempts', 'error', 'created_at', 'started_at', 'finished_at',
+                 'status_url', 'result_url']
+        read_only_fields = fields
+    
+    def get_error(self, obj):
+        # Last line of the stored traceback, e.g. "ValueError: ..."
+        return obj.error.strip().splitlines()[-1] if obj.error else None
+    
+    def _url(self, name, obj):
+        url = reverse(name, args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_status_url(self, obj):
+        return self._url('job-detail', obj)
+    
+    def get_result_url(self, obj):
+        return self._url('job-result', obj) if obj.status == 'succeeded' else None
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from master_data.models import Contact, Product, Tax, ChartOfAccount
+from transactions.models import (
+    CustomerInvoice, VendorBill, Payment, PaymentAllocation, SalesOrder, PurchaseOrder
+)
+from . import journal, stock
+from .cache import bump_ledger_version, bump_master_version
+
+
+@receiver(post_delete, sender=VendorBill)
+def unpost_deleted_vendor_bill(sender, instance, **kwargs):
+    """Reverse stock and journal postings of a deleted vendor bill"""
+    stock.unpost_document('vendor_bill', instance.pk)
+    journal.unpost_document('vendor_bill', instance.pk)
+
+
+@receiver(post_delete, sender=CustomerInvoice)
+def unpost_deleted_customer_invoice(sender, instance, **kwargs):
+    """Reverse stock and journal postings of a deleted customer invoice"""
+    stock.unpost_document('customer_invoice', instance.pk)
+    journal.unpost_document('customer_invoice', instance.pk)
+
+
+@receiver(post_delete, sender=Payment)
+def unpost_deleted_payment(sender, instance, **kwargs):
+    """Reverse the journal entry of a deleted payment"""
+    journal.unpost_document('payment', instance.pk)
+
+
+@receiver(post_save, sender=VendorBill)
+def post_saved_vendor_bill(sender, instance, raw=False, **kwargs):
+    """Keep the journal entry of a vendor bill in step with its totals"""
+    if not raw:
+        journal.post_document('vendor_bill', instance)
+
+
+@receiver(post_save, sender=CustomerInvoice)
+def post_saved_customer_invoice(sender, instance, raw=False, **kwargs):
+    """Keep the journal entry of a customer invoice in step with its totals"""
+    if not raw:
+        journal.post_document('customer_invoice', instance)
+
+
+@receiver(post_save, sender=Product)
+def revalue_unpurchased_stock(sender, instance, raw=False, **kwargs):
+    """Stock without purchases is valued at the product's purchase price"""
+    if not raw:
+        stock.refresh_unpurchased_cost(instance)
+
+
+@receiver(post_save, sender=Payment)
+def post_saved_payment(sender, instance, raw=False, **kwargs):
+    """Keep the journal entry of a payment in step with its totals"""
+    if not raw:
+        journal.post_document('payment', instance)
+
+
+@receiver([post_save, post_delete], sender=CustomerInvoice)
+@receiver([post_save, post_delete], sender=VendorBill)
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=PaymentAllocation)
+@receiver([post_save, post_delete], sender=SalesOrder)
+@receiver([post_save, post_delete], sender=PurchaseOrder)
+@receiver([post_save, post_delete], sender=Contact)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Tax)
+@receiver([post_save, post_delete], sender=ChartOfAccount)
+def invalidate_cached_summaries(sender, **kwargs):
+    """Move to a new ledger version once the write is committed"""
+    transaction.on_commit(bump_ledger_version)
+
+
+@receiver([post_save, post_delete], sender=Contact)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_master_data(sender, **kwargs):
+    """HSN codes and GST numbers feed the cached GST summaries of closed months"""
+    transaction.on_commit(bump_master_version)
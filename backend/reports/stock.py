@@ -0,0 +1,321 @@
+from decimal import Decimal
+from itertools import islice
+from django.db import transaction
+from django.db.models import Sum, F, DecimalField, ExpressionWrapper
+from django.utils import timezone
+from master_data.models import Product
+from transactions.models import VendorBillItem, CustomerInvoiceItem
+from .models import StockMovement, StockBalance
+
+
+ZERO = Decimal('0')
+TWO_PLACES = Decimal('0.01')
+
+LINE_VALUE = ExpressionWrapper(
+    F('quantity') * F('unit_price'),
+    output_field=DecimalField(max_digits=20, decimal_places=2)
+)
+
+
+def quantize(value):
+    """Round a quantity or amount to two decimal places"""
+    return Decimal(value or 0).quantize(TWO_PLACES)
+
+
+def purchase_totals(as_of_date=None):
+    """Purchased quantity and value per product from vendor bills, in one grouped query"""
+    items = VendorBillItem.objects.exclude(vendor_bill__status='cancelled')
+    if as_of_date:
+        items = items.filter(vendor_bill__bill_date__lte=as_of_date)
+    rows = items.values('product_id').annotate(
+        purchased_qty=Sum('quantity'),
+        purchase_value=Sum(LINE_VALUE),
+    ).order_by()
+    return {
+        row['product_id']: (row['purchased_qty'] or ZERO, row['purchase_value'] or ZERO)
+        for row in rows
+    }
+
+
+def sale_totals(as_of_date=None):
+    """Sold quantity per product from customer invoices, in one grouped query"""
+    items = CustomerInvoiceItem.objects.exclude(customer_invoice__status='cancelled')
+    if as_of_date:
+        items = items.filter(customer_invoice__invoice_date__lte=as_of_date)
+    rows = items.values('product_id').annotate(sold_qty=Sum('quantity')).order_by()
+    return {row['product_id']: row['sold_qty'] or ZERO for row in rows}
+
+
+def average_cost(purchased_qty, purchase_value, purchase_price):
+    """Average cost from purchases, falling back to the product's purchase price"""
+    if purchased_qty > 0:
+        return purchase_value / purchased_qty
+    return Decimal(str(purchase_price or ZERO))
+
+
+def current_quantity(opening_qty, purchased_qty, sold_qty, adjusted_qty):
+    return opening_qty + purchased_qty - sold_qty + adjusted_qty
+
+
+def _valuation_row(product, purchased_qty, purchase_value, sold_qty, opening_qty=ZERO, adjusted_qty=ZERO):
+    current_qty = current_quantity(opening_qty, purchased_qty, sold_qty, adjusted_qty)
+    avg_cost = average_cost(purchased_qty, purchase_value, product['purchase_price'])
+
+    return {
+        'product_id': product['id'],
+        'product_name': product['name'],
+        'product_type': product['type'],
+        'hsn_code': product['hsn_code'],
+        'opening_quantity': quantize(opening_qty),
+        'purchased_quantity': quantize(purchased_qty),
+        'sold_quantity': quantize(sold_qty),
+        'current_quantity': quantize(current_qty),
+        'average_cost': quantize(avg_cost),
+        'stock_value': quantize(current_qty * avg_cost),
+    }
+
+
+PRODUCT_FIELDS = ['id', 'name', 'type', 'hsn_code', 'purchase_price']
+# Opening and adjusted quantities are undated, so they count at every date
+UNDATED_FIELDS = ['stock_balance__opening_quantity', 'stock_balance__adjusted_quantity']
+
+
+def balances_are_current(as_of_date=None):
+    """True when the materialized balances already reflect the state as of the given date"""
+    if as_of_date is None:
+        return True
+    return not StockMovement.objects.filter(movement_date__gt=as_of_date).exists()
+
+
+def stock_valuation(as_of_date=None, chunk_size=2000):
+    """
+    Yield one stock report row per active product.
+
+    Current positions are read straight from StockBalance with one joined
+    query. Historical dates aggregate purchases and sales once for the whole
+    catalog and merge them while products are streamed, so the number of
+    queries never grows with the number of products.
+    """
+    products = Product.objects.filter(is_active=True).order_by('name', 'id')
+
+    if balances_are_current(as_of_date):
+        rows = products.values(
+            *PRODUCT_FIELDS, *UNDATED_FIELDS,
+            'stock_balance__purchased_quantity', 'stock_balance__purchased_value', 'stock_balance__sold_quantity',
+        )
+        for product in rows.iterator(chunk_size=chunk_size):
+            yield _valuation_row(
+                product,
+                product['stock_balance__purchased_quantity'] or ZERO,
+                product['stock_balance__purchased_value'] or ZERO,
+                product['stock_balance__sold_quantity'] or ZERO,
+                product['stock_balance__opening_quantity'] or ZERO,
+                product['stock_balance__adjusted_quantity'] or ZERO,
+            )
+        return
+
+    purchased = purchase_totals(as_of_date)
+    sold = sale_totals(as_of_date)
+    for product in products.values(*PRODUCT_FIELDS, *UNDATED_FIELDS).iterator(chunk_size=chunk_size):
+        purchased_qty, purchase_value = purchased.get(product['id'], (ZERO, ZERO))
+        yield _valuation_row(
+            product, purchased_qty, purchase_value, sold.get(product['id'], ZERO),
+            product['stock_balance__opening_quantity'] or ZERO,
+            product['stock_balance__adjusted_quantity'] or ZERO,
+        )
+
+
+# ---------- Stock posting ----------
+
+def _posted_lines(movements):
+    """Group already posted movements into {product_id: (quantity, value)}"""
+    rows = movements.values('product_id').annotate(
+        posted_qty=Sum('quantity'), posted_value=Sum('total_value')
+    ).order_by()
+    return {row['product_id']: (row['posted_qty'] or ZERO, row['posted_value'] or ZERO) for row in rows}
+
+
+def _document_lines(items):
+    """Group a document's line items into {product_id: (quantity, value)}"""
+    lines = {}
+    for item in items:
+        quantity, value = lines.get(item.product_id, (ZERO, ZERO))
+        lines[item.product_id] = (quantity + item.quantity, value + quantize(item.quantity * item.unit_price))
+    return lines
+
+
+def _balance_deltas(source_type, old, new):
+    """Difference between the previously posted and the new per-product lines"""
+    qty_field = 'purchased_quantity' if source_type == 'vendor_bill' else 'sold_quantity'
+    deltas = {}
+    for product_id in set(old) | set(new):
+        old_qty, old_value = old.get(product_id, (ZERO, ZERO))
+        new_qty, new_value = new.get(product_id, (ZERO, ZERO))
+        if old_qty == new_qty and old_value == new_value:
+            continue
+        delta = {qty_field: new_qty - old_qty}
+        if source_type == 'vendor_bill':
+            delta['purchased_value'] = new_value - old_value
+        deltas[product_id] = delta
+    return deltas
+
+
+def _refresh_balance(balance, purchase_price):
+    """Recompute the derived quantity, average cost and value of a balance row, as the report does"""
+    balance.current_quantity = current_quantity(
+        balance.opening_quantity, balance.purchased_quantity, balance.sold_quantity, balance.adjusted_quantity
+    )
+    cost = average_cost(balance.purchased_quantity, balance.purchased_value, purchase_price)
+    balance.average_cost = quantize(cost)
+    balance.stock_value = quantize(balance.current_quantity * cost)
+    balance.last_updated = timezone.now()
+
+
+BALANCE_FIELDS = [
+    'purchased_quantity', 'purchased_value', 'sold_quantity', 'current_quantity',
+    'average_cost', 'stock_value', 'last_updated',
+]
+
+
+def _locked_balances(product_ids):
+    """Fetch (creating where missing) and lock the balance rows for the given products"""
+    existing = set(StockBalance.objects.filter(product_id__in=product_ids).values_list('product_id', flat=True))
+    missing = [StockBalance(product_id=pid) for pid in product_ids if pid not in existing]
+    if missing:
+        StockBalance.objects.bulk_create(missing, ignore_conflicts=True)
+    return list(StockBalance.objects.select_for_update().filter(product_id__in=product_ids))
+
+
+def _purchase_prices(product_ids):
+    return dict(Product.objects.filter(id__in=product_ids).values_list('id', 'purchase_price'))
+
+
+def apply_balance_deltas(deltas):
+    """
+    Adjust StockBalance rows by the given per-product deltas.
+
+    Rows are locked for the duration of the surrounding transaction and
+    written back with a single bulk update.
+    """
+    if not deltas:
+        return
+    balances = _locked_balances(list(deltas))
+    prices = _purchase_prices(list(deltas))
+    for balance in balances:
+        for field, amount in deltas[balance.product_id].items():
+            setattr(balance, field, getattr(balance, field) + amount)
+        _refresh_balance(balance, prices.get(balance.product_id))
+    StockBalance.objects.bulk_update(balances, BALANCE_FIELDS)
+
+
+def refresh_unpurchased_cost(product):
+    """Revalue a product's balance at its purchase price while it has no purchases to average"""
+    with transaction.atomic():
+        balances = list(StockBalance.objects.select_for_update().filter(product=product, purchased_quantity=0))
+        for balance in balances:
+            _refresh_balance(balance, product.purchase_price)
+        StockBalance.objects.bulk_update(balances, BALANCE_FIELDS)
+
+
+def _movement(source_type, source_id, product_id, quantity, unit_price, movement_date, reference):
+    return StockMovement(
+        product_id=product_id,
+        movement_type='purchase' if source_type == 'vendor_bill' else 'sale',
+        quantity=quantity,
+        unit_price=unit_price,
+        total_value=quantize(quantity * unit_price),
+        reference_document=reference,
+        movement_date=movement_date,
+        source_type=source_type,
+        source_id=source_id,
+    )
+
+
+def _sync_document(source_type, document, items, movement_date, reference):
+    """Replace the movements posted for a document and adjust balances by the difference"""
+    if document.status == 'cancelled':
+        items = []
+    with transaction.atomic():
+        posted = StockMovement.objects.filter(source_type=source_type, source_id=document.pk)
+        old = _posted_lines(posted)
+        posted.delete()
+        StockMovement.objects.bulk_create([
+            _movement(source_type, document.pk, item.product_id, item.quantity,
+                      item.unit_price, movement_date, reference)
+            for item in items
+        ])
+        apply_balance_deltas(_balance_deltas(source_type, old, _document_lines(items)))
+
+
+def post_vendor_bill(bill):
+    """Post (or re-post) a vendor bill's line items to the stock ledger"""
+    _sync_document('vendor_bill', bill, list(bill.items.all()), bill.bill_date, bill.bill_number)
+
+
+def post_customer_invoice(invoice):
+    """Post (or re-post) a customer invoice's line items to the stock ledger"""
+    _sync_document('customer_invoice', invoice, list(invoice.items.all()),
+                   invoice.invoice_date, invoice.invoice_number)
+
+
+def unpost_document(source_type, document_id):
+    """Reverse everything a deleted bill or invoice posted to the stock ledger"""
+    with transaction.atomic():
+        posted = StockMovement.objects.filter(source_type=source_type, source_id=document_id)
+        old = _posted_lines(posted)
+        posted.delete()
+        apply_balance_deltas(_balance_deltas(source_type, old, {}))
+
+
+def _posted_movements():
+    """Movements for every non-cancelled bill and invoice line, built from two streamed queries"""
+    bill_items = VendorBillItem.objects.exclude(vendor_bill__status='cancelled').values_list(
+        'vendor_bill_id', 'product_id', 'quantity', 'unit_price',
+        'vendor_bill__bill_date', 'vendor_bill__bill_number',
+    )
+    for bill_id, product_id, quantity, price, bill_date, number in bill_items.iterator(chunk_size=2000):
+        yield _movement('vendor_bill', bill_id, product_id, quantity, price, bill_date, number)
+
+    invoice_items = CustomerInvoiceItem.objects.exclude(customer_invoice__status='cancelled').values_list(
+        'customer_invoice_id', 'product_id', 'quantity', 'unit_price',
+        'customer_invoice__invoice_date', 'customer_invoice__invoice_number',
+    )
+    for invoice_id, product_id, quantity, price, invoice_date, number in invoice_items.iterator(chunk_size=2000):
+        yield _movement('customer_invoice', invoice_id, product_id, quantity, price, invoice_date, number)
+
+
+def rebuild_stock_ledger(batch_size=2000):
+    """
+    Recreate all posted movements and balances from existing bills and invoices.
+
+    Returns the number of movements written.
+    """
+    with transaction.atomic():
+        StockMovement.objects.filter(source_type__isnull=False).delete()
+        written = 0
+        movements = _posted_movements()
+        while True:
+            batch = list(islice(movements, batch_size))
+            if not batch:
+                break
+            StockMovement.objects.bulk_create(batch)
+            written += len(batch)
+
+        purchased = _posted_lines(StockMovement.objects.filter(source_type='vendor_bill'))
+        sold = {
+            product_id: quantity
+            for product_id, (quantity, value) in _posted_lines(
+                StockMovement.objects.filter(source_type='customer_invoice')
+            ).items()
+        }
+        product_ids = set(purchased) | set(sold) | set(
+            StockBalance.objects.values_list('product_id', flat=True)
+        )
+        balances = _locked_balances(list(product_ids))
+        prices = _purchase_prices(list(product_ids))
+        for balance in balances:
+            balance.purchased_quantity, balance.purchased_value = purchased.get(balance.product_id, (ZERO, ZERO))
+            balance.sold_quantity = sold.get(balance.product_id, ZERO)
+            _refresh_balance(balance, prices.get(balance.product_id))
+        StockBalance.objects.bulk_update(balances, BALANCE_FIELDS, batch_size=batch_size)
+        return written
@@ -11,5 +11,14 @@ urlpatterns = [
     path('profit-loss/', views.profit_loss, name='profit-loss'),
     path('partner-ledger/', views.partner_ledger, name='partner-ledger'),
     path('stock-report/', views.stock_report, name='stock-report'),
+    path('receivables-aging/', views.receivables_aging, name='receivables-aging'),
+    path('payables-aging/', views.payables_aging, name='payables-aging'),
+    path('gst-summary/', views.gst_summary_report, name='gst-summary'),
     path('dashboard-summary/', views.dashboard_summary, name='dashboard-summary'),
+    path('cache-stats/', views.summary_cache_stats, name='summary-cache-stats'),
+    
+    # Background jobs
+    path('jobs/', views.job_list_create, name='job-list-create'),
+    path('jobs/<int:pk>/', views.job_detail, name='job-detail'),
+    path('jobs/<int:pk>/result/', views.job_result, name='job-result'),
 ]
@@ -1,84 +1,104 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
-from django.db.models import Q, Sum, F, Case, When, DecimalField
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Q, Case, When, DecimalField
+from django.conf import settings
+from django.http import FileResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import StockMovement, StockBalance
+from decimal import Decimal
+from urllib.parse import urlencode
+import os
+from itertools import chain
+from .models import StockMovement, StockBalance, Job
 from .serializers import (
     StockMovementSerializer, StockBalanceSerializer,
     BalanceSheetSerializer, ProfitLossSerializer, 
-    PartnerLedgerSerializer, StockReportSerializer
+    JobSerializer
 )
 from master_data.models import ChartOfAccount, Contact
-from transactions.models import CustomerInvoice, VendorBill, Payment, PaymentAllocation
+from .journal import account_balances, account_activity
+from .metrics import invoice_metrics, bill_metrics, contact_metrics, product_metrics
+from .stock import stock_valuation
+from .streaming import stream_json_response, export_response, EXPORT_RENDERERS
+from .aging import BUCKETS, aging_report
+from .ledger import opening_balance, ledger_rows
+from .periods import GROUP_BY, profit_loss_periods
+from .gst import SIDES as GST_SIDES, HSN_COLUMNS, RATE_COLUMNS, gst_summary
+from .cache import cached_summary, cache_stats
+from .jobs import REPORT_VIEWS, async_report, submit_job
+
+
+def _parse_date(value, default):
+    """Parse a YYYY-MM-DD query parameter, falling back to default"""
+    if not value:
+        return default
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value
+
+
+# Columns of the ?format=csv|xlsx downloads of the reports below
+REPORT_COLUMNS = {
+    'balance': [('account_name', 'Account'), ('account_type', 'Type'), ('balance', 'Balance')],
+    'amount': [('account_name', 'Account'), ('account_type', 'Type'), ('amount', 'Amount')],
+    'ledger': [
+        ('date', 'Date'), ('transaction_type', 'Transaction'), ('reference', 'Reference'),
+        ('description', 'Description'), ('debit', 'Debit'), ('credit', 'Credit'), ('running_balance', 'Balance'),
+    ],
+    'stock': [
+        ('product_name', 'Product'), ('product_type', 'Type'), ('hsn_code', 'HSN Code'),
+        ('opening_quantity', 'Opening Qty'), ('purchased_quantity', 'Purchased Qty'), ('sold_quantity', 'Sold Qty'),
+        ('current_quantity', 'Current Qty'), ('average_cost', 'Average Cost'), ('stock_value', 'Stock Value'),
+    ],
+}
 
 
 class StockMovementListCreateView(generics.ListCreateAPIView):
     """View for listing and creating stock movements"""
-    queryset = StockMovement.objects.all()
+    queryset = StockMovement.objects.select_related('product')
     serializer_class = StockMovementSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = ['django_filters.rest_framework.DjangoFilterBackend']
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product', 'movement_type', 'movement_date']
 
 
 class StockBalanceListView(generics.ListAPIView):
-    """View for listing stock balances"""
-    queryset = StockBalance.objects.all()
+    """View for listing stock balances maintained by stock posting"""
+    queryset = StockBalance.objects.select_related('product').order_by('product__name')
     serializer_class = StockBalanceSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = ['django_filters.rest_framework.DjangoFilterBackend']
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['product']
 
 
 @api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
 @permission_classes([permissions.IsAuthenticated])
+@async_report('balance_sheet')
 def balance_sheet(request):
-    """Generate Balance Sheet report"""
-    as_of_date = request.GET.get('as_of_date', timezone.now().date())
-    
-    # Calculate actual balances from transactions
-    from transactions.models import CustomerInvoice, VendorBill
+    """Generate Balance Sheet report from posted account balances"""
+    as_of_date = _parse_date(request.GET.get('as_of_date'), timezone.now().date())
     
+    balances = account_balances(as_of_date)
     balance_sheet_data = []
     
-    # Assets - Calculate from customer invoices and cash
-    total_receivables = CustomerInvoice.objects.filter(
-        invoice_date__lte=as_of_date,
-        status__in=['pending', 'partially_paid']
-    ).aggregate(total=Sum('balance_due'))['total'] or 0
-    
-    total_cash = CustomerInvoice.objects.filter(
-        invoice_date__lte=as_of_date,
-        status='paid'
-    ).aggregate(total=Sum('grand_total'))['total'] or 0
-    
-    # Subtract cash paid for vendor bills
-    cash_paid = VendorBill.objects.filter(
-        bill_date__lte=as_of_date,
-        status='paid'
-    ).aggregate(total=Sum('grand_total'))['total'] or 0
-    
-    total_cash = (total_cash or 0) - (cash_paid or 0)
-    
-    # Add asset accounts
-    balance_sheet_data.append({
-        'account_name': 'Cash',
-        'account_type': 'asset',
-        'balance': max(total_cash, 0),
-        'is_total': False
-    })
-    
-    balance_sheet_data.append({
-        'account_name': 'Accounts Receivable',
-        'account_type': 'asset',
-        'balance': total_receivables,
-        'is_total': False
-    })
-    
-    total_assets = max(total_cash, 0) + total_receivables
-    
+    def add_section(account_type):
+        section_total = Decimal('0')
+        for account, balance in balances:
+            if account.type == account_type and balance:
+                balance_sheet_data.append({
+                    'account_name': account.name,
+                    'account_type': account_type,
+                    'balance': balance,
+                    'is_total': False
+                })
+                section_total += balance
+        return section_total
+    
+    # Assets
+    total_assets = add_section('asset')
     balance_sheet_data.append({
         'account_name': 'Total Assets',
         'account_type': 'asset',
@@ -86,30 +106,21 @@ def balance_sheet(request):
         'is_total': True
     })
     
-    # Liabilities - Calculate from vendor bills
-    total_payables = VendorBill.objects.filter(
-        bill_date__lte=as_of_date,
-        status__in=['pending', 'partially_paid']
-    ).aggregate(total=Sum('balance_due'))['total'] or 0
-    
-    balance_sheet_data.append({
-        'account_name': 'Accounts Payable',
-        'account_type': 'liability',
-        'balance': total_payables,
-        'is_total': False
-    })
-    
-    # Equity - Calculate as balancing figure
-    total_equity = total_assets - total_payables
-    
+    # Liabilities and equity, with accumulated profit shown as retained earnings
+    total_payables = add_section('liability')
+    total_equity = add_section('equity')
+    retained_earnings = (
+        sum(balance for account, balance in balances if account.type == 'income') -
+        sum(balance for account, balance in balances if account.type == 'expense')
+    )
     balance_sheet_data.append({
         'account_name': 'Retained Earnings',
         'account_type': 'equity',
-        'balance': total_equity,
+        'balance': retained_earnings,
         'is_total': False
     })
     
-    total_liabilities_equity = total_payables + total_equity
+    total_liabilities_equity = total_payables + total_equity + retained_earnings
     balance_sheet_data.append({
         'account_name': 'Total Liabilities & Equity',
         'account_type': 'liability_equity',
@@ -117,70 +128,62 @@ def balance_sheet(request):
         'is_total': True
     })
     
+    export = export_response(request, balance_sheet_data, REPORT_COLUMNS['balance'], f'balance_sheet_{as_of_date}')
+    if export:
+        return export
+    
     serializer = BalanceSheetSerializer(balance_sheet_data, many=True)
     return Response({
         'as_of_date': as_of_date,
         'data': serializer.data,
         'total_assets': total_assets,
         'total_liabilities_equity': total_liabilities_equity,
-        'is_balanced': abs(total_assets - total_liabilities_equity) < 0.01
+        'is_balanced': abs(total_assets - total_liabilities_equity) < Decimal('0.01')
     })
 
 
 @api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
 @permission_classes([permissions.IsAuthenticated])
+@async_report('profit_loss')
 def profit_loss(request):
-    """Generate Profit & Loss report"""
-    start_date = request.GET.get('start_date', (timezone.now().date() - timedelta(days=30)))
-    end_date = request.GET.get('end_date', timezone.now().date())
+    """
+    Generate Profit & Loss report from posted account balances.
+
+    With ?group_by=month|quarter|year the range is broken down into fiscal
+    periods, one amount column per period.
+    """
+    start_date = _parse_date(request.GET.get('start_date'), timezone.now().date() - timedelta(days=30))
+    end_date = _parse_date(request.GET.get('end_date'), timezone.now().date())
     
-    # Convert string dates to date objects if needed
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    group_by = request.GET.get('group_by')
+    if group_by:
+        return _profit_loss_periods(request, start_date, end_date, group_by)
     
+    activity = account_activity(start_date, end_date, types=['income', 'expense'])
     profit_loss_data = []
     
-    # Income - Calculate from customer invoices
-    total_sales = CustomerInvoice.objects.filter(
-        invoice_date__range=[start_date, end_date]
-    ).aggregate(total=Sum('grand_total'))['total'] or 0
-    
-    profit_loss_data.append({
-        'account_name': 'Sales Revenue',
-        'account_type': 'income',
-        'amount': total_sales,
-        'is_total': False
-    })
-    
-    total_income = total_sales
-    profit_loss_data.append({
-        'account_name': 'Total Income',
-        'account_type': 'income',
-        'amount': total_income,
-        'is_total': True
-    })
-    
-    # Expenses - Calculate from vendor bills
-    total_purchases = VendorBill.objects.filter(
-        bill_date__range=[start_date, end_date]
-    ).aggregate(total=Sum('grand_total'))['total'] or 0
-    
-    profit_loss_data.append({
-        'account_name': 'Cost of Goods Sold',
-        'account_type': 'expense',
-        'amount': total_purchases,
-        'is_total': False
-    })
+    def add_section(account_type, total_label):
+        section_total = Decimal('0')
+        for account, amount in activity:
+            if account.type == account_type and amount:
+                profit_loss_data.append({
+                    'account_name': account.name,
+                    'account_type': account_type,
+                    'amount': amount,
+                    'is_total': False
+                })
+                section_total += amount
+        profit_loss_data.append({
+            'account_name': total_label,
+            'account_type': account_type,
+            'amount': section_total,
+            'is_total': True
+        })
+        return section_total
     
-    total_expenses = total_purchases
-    profit_loss_data.append({
-        'account_name': 'Total Expenses',
-        'account_type': 'expense',
-        'amount': total_expenses,
-        'is_total': True
-    })
+    total_income = add_section('income', 'Total Income')
+    total_expenses = add_section('expense', 'Total Expenses')
     
     # Net Profit/Loss
     net_profit = total_income - total_expenses
@@ -191,6 +194,10 @@ def profit_loss(request):
         'is_total': True
     })
     
+    export = export_response(request, profit_loss_data, REPORT_COLUMNS['amount'], f'profit_loss_{start_date}_{end_date}')
+    if export:
+        return export
+    
     serializer = ProfitLossSerializer(profit_loss_data, many=True)
     return Response({
         'start_date': start_date,
@@ -202,243 +209,205 @@ def profit_loss(request):
     })
 
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def partner_ledger(request):
-    """Generate Partner Ledger report"""
-    partner_id = request.GET.get('partner_id')
-    start_date = request.GET.get('start_date', (timezone.now().date() - timedelta(days=30)))
-    end_date = request.GET.get('end_date', timezone.now().date())
-    
-    if not partner_id:
-        return Response({'error': 'Partner ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+def _profit_loss_periods(request, start_date, end_date, group_by):
+    if group_by not in GROUP_BY:
+        return Response({'error': f"group_by must be one of {', '.join(GROUP_BY)}"}, status=status.HTTP_400_BAD_REQUEST)
+    if end_date < start_date:
+        return Response({'error': 'end_date is before start_date'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    spans, rows, totals = profit_loss_periods(start_date, end_date, group_by)
+    columns = REPORT_COLUMNS['amount'][:2] + [(key, label) for key, label, first, last in spans] + [('total', 'Total')]
+    export = export_response(request, rows, columns, f'profit_loss_{group_by}_{start_date}_{end_date}')
+    if export:
+        return export
     
-    try:
-        contact = Contact.objects.get(id=partner_id)
-    except Contact.DoesNotExist:
-        return Response({'error': 'Contact not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Convert string dates to date objects if needed
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    ledger_data = []
-    running_balance = 0
-    total_debit = 0
-    total_credit = 0
-    
-    # Get customer invoices
-    invoices = CustomerInvoice.objects.filter(
-        customer=contact,
-        invoice_date__range=[start_date, end_date]
-    ).order_by('invoice_date')
-    
-    for invoice in invoices:
-        running_balance += float(invoice.grand_total)
-        total_debit += float(invoice.grand_total)
-        ledger_data.append({
-            'date': invoice.invoice_date,
-            'transaction_type': 'Invoice',
-            'reference': invoice.invoice_number,
-            'description': f'Invoice #{invoice.invoice_number}',
-            'debit': float(invoice.grand_total),
-            'credit': 0,
-            'running_balance': running_balance
-        })
-    
-    # Get vendor bills
-    bills = VendorBill.objects.filter(
-        vendor=contact,
-        bill_date__range=[start_date, end_date]
-    ).order_by('bill_date')
-    
-    for bill in bills:
-        running_balance -= float(bill.grand_total)
-        total_credit += float(bill.grand_total)
-        ledger_data.append({
-            'date': bill.bill_date,
-            'transaction_type': 'Bill',
-            'reference': bill.bill_number,
-            'description': f'Bill #{bill.bill_number}',
-            'debit': 0,
-            'credit': float(bill.grand_total),
-            'running_balance': running_balance
-        })
-    
-    # Sort by date
-    ledger_data.sort(key=lambda x: x['date'])
-    
-    serializer = PartnerLedgerSerializer(ledger_data, many=True)
     return Response({
-        'contact_name': contact.name,
-        'contact_type': contact.contact_type,
         'start_date': start_date,
         'end_date': end_date,
-        'opening_balance': 0,  # Simplified - would calculate from earlier transactions
+        'group_by': group_by,
+        'periods': [
+            {'key': key, 'label': label, 'start_date': first, 'end_date': last}
+            for key, label, first, last in spans
+        ],
+        'data': rows,
+        **totals,
     })
 
 
 @api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
 @permission_classes([permissions.IsAuthenticated])
+@async_report('partner_ledger')
 def partner_ledger(request):
-    """Generate Partner Ledger report"""
+    """Generate Partner Ledger report, streamed with a running balance from the opening balance"""
     partner_id = request.GET.get('partner_id')
-    start_date = request.GET.get('start_date', (timezone.now().date() - timedelta(days=30)))
-    end_date = request.GET.get('end_date', timezone.now().date())
+    start_date = _parse_date(request.GET.get('start_date'), timezone.now().date() - timedelta(days=30))
+    end_date = _parse_date(request.GET.get('end_date'), timezone.now().date())
     
     if not partner_id:
         return Response({'error': 'Partner ID is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
         contact = Contact.objects.get(id=partner_id)
-    except Contact.DoesNotExist:
+    except (Contact.DoesNotExist, ValueError):
         return Response({'error': 'Contact not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Convert string dates to date objects if needed
-    if isinstance(start_date, str):
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-    if isinstance(end_date, str):
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    
-    ledger_data = []
-    running_balance = 0
-    total_debit = 0
-    total_credit = 0
-    
-    # Get customer invoices
-    invoices = CustomerInvoice.objects.filter(
-        customer=contact,
-        invoice_date__range=[start_date, end_date]
-    ).order_by('invoice_date')
-    
-    for invoice in invoices:
-        running_balance += float(invoice.grand_total)
-        total_debit += float(invoice.grand_total)
-        ledger_data.append({
-            'date': invoice.invoice_date,
-            'transaction_type': 'Invoice',
-            'reference': invoice.invoice_number,
-            'description': f'Invoice #{invoice.invoice_number}',
-            'debit': float(invoice.grand_total),
-            'credit': 0,
-            'running_balance': running_balance
-        })
-    
-    # Get vendor bills
-    bills = VendorBill.objects.filter(
-        vendor=contact,
-        bill_date__range=[start_date, end_date]
-    ).order_by('bill_date')
-    
-    for bill in bills:
-        running_balance -= float(bill.grand_total)
-        total_credit += float(bill.grand_total)
-        ledger_data.append({
-            'date': bill.bill_date,
-            'transaction_type': 'Bill',
-            'reference': bill.bill_number,
-            'description': f'Bill #{bill.bill_number}',
-            'debit': 0,
-            'credit': float(bill.grand_total),
-            'running_balance': running_balance
-        })
-    
-    # Sort by date
-    ledger_data.sort(key=lambda x: x['date'])
-    
-    serializer = PartnerLedgerSerializer(ledger_data, many=True)
-    return Response({
-        'contact_name': contact.name,
-        'contact_type': contact.contact_type,
-        'start_date': start_date,
-        'end_date': end_date,
-        'opening_balance': 0,  # Simplified - would calculate from earlier transactions
-        'closing_balance': running_balance,
-        'total_debit': total_debit,
-        'total_credit': total_credit,
-        'transactions': serializer.data
-    })
+    opening = opening_balance(contact.id, start_date)
+    totals = {'closing_balance': opening, 'total_debit': Decimal('0'), 'total_credit': Decimal('0')}
+    
+    def rows():
+        for row in ledger_rows(contact.id, start_date, end_date, opening):
+            totals['total_debit'] += row['debit']
+            totals['total_credit'] += row['credit']
+            totals['closing_balance'] = row['running_balance']
+            yield row
+    
+    opening_row = {'date': start_date, 'transaction_type': 'Opening Balance', 'running_balance': opening}
+    export = export_response(request, chain([opening_row], rows()), REPORT_COLUMNS['ledger'],
+                             f'partner_ledger_{contact.id}_{start_date}_{end_date}')
+    if export:
+        return export
+    
+    return stream_json_response(
+        rows(),
+        header={
+            'contact_name': contact.name,
+            'contact_type': contact.type,
+            'start_date': start_date,
+            'end_date': end_date,
+            'opening_balance': opening,
+        },
+        footer=lambda: totals,
+        rows_key='transactions',
+    )
 
 
 @api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
 @permission_classes([permissions.IsAuthenticated])
+@async_report('stock_report')
 def stock_report(request):
     """Generate Stock Report"""
-    from master_data.models import Product
-    from transactions.models import CustomerInvoiceLineItem, VendorBillLineItem
+    as_of_date = _parse_date(request.GET.get('as_of_date'), timezone.now().date())
     
-    as_of_date = request.GET.get('as_of_date', timezone.now().date())
+    totals = {'total_stock_value': Decimal('0'), 'total_products': 0}
     
-    # Get all products
-    products = Product.objects.filter(is_active=True)
+    def rows():
+        for row in stock_valuation(as_of_date):
+            totals['total_stock_value'] += row['stock_value']
+            totals['total_products'] += 1
+            yield row
     
-    stock_data = []
-    total_stock_value = 0
+    export = export_response(request, rows(), REPORT_COLUMNS['stock'], f'stock_report_{as_of_date}')
+    if export:
+        return export
     
-    for product in products:
-        # Calculate purchased quantity from vendor bills
-        purchased_qty = VendorBillLineItem.objects.filter(
-            product=product,
-            vendor_bill__bill_date__lte=as_of_date
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
-        # Calculate sold quantity from customer invoices
-        sold_qty = CustomerInvoiceLineItem.objects.filter(
-            product=product,
-            customer_invoice__invoice_date__lte=as_of_date
-        ).aggregate(total=Sum('quantity'))['total'] or 0
-        
-        # Current quantity = purchased - sold
-        current_qty = purchased_qty - sold_qty
-        
-        # Calculate average cost from purchases
-        total_purchase_value = VendorBillLineItem.objects.filter(
-            product=product,
-            vendor_bill__bill_date__lte=as_of_date
-        ).aggregate(total=Sum(F('quantity') * F('unit_price')))['total'] or 0
-        
-        avg_cost = (total_purchase_value / purchased_qty) if purchased_qty > 0 else product.selling_price or 0
-        stock_value = current_qty * avg_cost
-        total_stock_value += stock_value
-        
-        stock_data.append({
-            'product_name': product.name,
-            'product_type': product.type,
-            'product_sku': product.sku,
-            'opening_quantity': 0,  # Simplified - would need opening stock feature
-            'purchased_quantity': purchased_qty,
-            'sold_quantity': sold_qty,
-            'current_quantity': current_qty,
-            'average_cost': avg_cost,
-            'stock_value': stock_value
-        })
+    return stream_json_response(
+        rows(),
+        header={'as_of_date': as_of_date},
+        footer=lambda: totals,
+    )
+
+
+def _aging_response(request, side):
+    """Aging report for one side as JSON, or as a streamed download with ?format=csv|xlsx"""
+    if not (request.user.is_admin() or request.user.is_invoicing_user()):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    as_of_date = _parse_date(request.GET.get('as_of_date'), timezone.now().date())
+    report = aging_report(side, as_of_date)
+
+    columns = [('contact_name', 'Contact')] + BUCKETS + [('total', 'Total')]
+    total_row = {'contact_name': 'Total', **report['totals']}
+    export = export_response(request, report['rows'] + [total_row], columns, f'{side}_aging_{as_of_date}')
+    if export:
+        return export
+
+    return Response({
+        'as_of_date': as_of_date,
+        'buckets': [{'key': key, 'label': label} for key, label in BUCKETS],
+        'data': report['rows'],
+        'totals': report['totals'],
+    })
+
+
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([permissions.IsAuthenticated])
+@async_report('receivables_aging')
+def receivables_aging(request):
+    """Customer invoice balances by days past due"""
+    return _aging_response(request, 'receivable')
+
+
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([permissions.IsAuthenticated])
+@async_report('payables_aging')
+def payables_aging(request):
+    """Vendor bill balances by days past due"""
+    return _aging_response(request, 'payable')
+
+
+@api_view(['GET'])
+@renderer_classes(EXPORT_RENDERERS)
+@permission_classes([permissions.IsAuthenticated])
+@async_report('gst_summary_report')
+def gst_summary_report(request):
+    """
+    GSTR-1 style HSN-wise and rate-wise tax summary of invoice (outward) or bill (inward) lines.
+
+    Takes ?month=YYYY-MM or start_date/end_date (default: this month so far)
+    and ?side=outward|inward. Downloads carry the HSN table, or the rate
+    table with ?summary=rate.
+    """
+    side = request.GET.get('side', 'outward')
+    if side not in GST_SIDES:
+        return Response({'error': f"side must be one of {', '.join(GST_SIDES)}"}, status=status.HTTP_400_BAD_REQUEST)
+    today = timezone.now().date()
+    if request.GET.get('month'):
+        try:
+            start_date = datetime.strptime(request.GET['month'], '%Y-%m').date()
+        except ValueError:
+            return Response({'error': 'month must be YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        end_date = (start_date + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    else:
+        start_date = _parse_date(request.GET.get('start_date'), today.replace(day=1))
+        end_date = _parse_date(request.GET.get('end_date'), today)
+    
+    summary = gst_summary(side, start_date, end_date)
+    if request.GET.get('summary') == 'rate':
+        rows, columns = summary['rate_summary'], RATE_COLUMNS
+    else:
+        rows, columns = summary['hsn_summary'], HSN_COLUMNS
+    export = export_response(request, rows, columns, f'gst_{side}_{start_date}_{end_date}')
+    if export:
+        return export
     
-    serializer = StockReportSerializer(stock_data, many=True)
     return Response({
-        'data': serializer.data,
-        'total_stock_value': total_stock_value,
-        'total_products': len(stock_data)
+        'start_date': start_date,
+        'end_date': end_date,
+        'side': side,
+        **summary,
     })
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@async_report('dashboard_summary')
+@cached_summary('dashboard_summary')
 def dashboard_summary(request):
     """Get summary data for dashboard"""
     user = request.user
     
     if user.is_admin() or user.is_invoicing_user():
-        # Calculate key metrics
-        total_sales = CustomerInvoice.objects.filter(status='paid').aggregate(
-            total=Sum('grand_total')
-        )['total'] or 0
-        
-        total_purchases = VendorBill.objects.filter(status='paid').aggregate(
-            total=Sum('grand_total')
-        )['total'] or 0
+        invoices = invoice_metrics()
+        bills = bill_metrics()
+        contacts = contact_metrics()
+        products = product_metrics()
         
+        total_sales = invoices['paid_amount']
+        total_purchases = bills['paid_amount']
         net_profit = total_sales - total_purchases
         
         # Get cash balance from chart of accounts
@@ -448,48 +417,39 @@ def dashboard_summary(request):
         except:
             cash_balance = 0
         
-        # Get pending amounts
-        pending_sales = CustomerInvoice.objects.filter(status='pending').aggregate(
-            total=Sum('balance_due')
-        )['total'] or 0
-        
-        pending_purchases = VendorBill.objects.filter(status='pending').aggregate(
-            total=Sum('balance_due')
-        )['total'] or 0
-        
         summary = {
             'total_sales': total_sales,
             'total_purchases': total_purchases,
             'net_profit': net_profit,
             'cash_balance': cash_balance,
-            'pending_sales': pending_sales,
-            'pending_purchases': pending_purchases,
-            'total_customers': Contact.objects.filter(type__in=['customer', 'both']).count(),
-            'total_vendors': Contact.objects.filter(type__in=['vendor', 'both']).count(),
-            'total_products': StockBalance.objects.count(),
-            'low_stock_products': StockBalance.objects.filter(current_quantity__lt=10).count(),
+            'pending_sales': invoices['pending_amount'],
+            'pending_purchases': bills['pending_amount'],
+            'overdue_sales': invoices['overdue_amount'],
+            'overdue_purchases': bills['overdue_amount'],
+            'total_customers': contacts['customers'],
+            'total_vendors': contacts['vendors'],
+            'total_products': products['stocked'],
+            'low_stock_products': products['low_stock'],
         }
     else:
         # Contact user summary
         try:
             contact = request.user.contact_profile
             if contact.type in ['customer', 'both']:
-                total_invoices = CustomerInvoice.objects.filter(customer=contact).count()
-                pending_invoices = CustomerInvoice.objects.filter(customer=contact, status='pending').count()
-                total_due = CustomerInvoice.objects.filter(customer=contact, status='pending').aggregate(
-                    total=Sum('balance_due')
-                )['total'] or 0
+                invoices = invoice_metrics(customer=contact)
+                total_invoices = invoices['total']
+                pending_invoices = invoices['pending']
+                total_due = invoices['pending_amount']
             else:
                 total_invoices = 0
                 pending_invoices = 0
                 total_due = 0
             
             if contact.type in ['vendor', 'both']:
-                total_bills = VendorBill.objects.filter(vendor=contact).count()
-                pending_bills = VendorBill.objects.filter(vendor=contact, status='pending').count()
-                total_payable = VendorBill.objects.filter(vendor=contact, status='pending').aggregate(
-                    total=Sum('balance_due')
-                )['total'] or 0
+                bills = bill_metrics(vendor=contact)
+                total_bills = bills['total']
+                pending_bills = bills['pending']
+                total_payable = bills['pending_amount']
             else:
                 total_bills = 0
                 pending_bills = 0
@@ -507,3 +467,69 @@ def dashboard_summary(request):
             summary = {'error': 'Contact profile not found'}
     
     return Response(summary)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def summary_cache_stats(request):
+    """Hit and miss counters of the dashboard and summary cache"""
+    return Response(cache_stats())
+
+
+# Background Jobs
+def _job_for(request, pk):
+    """The job if it belongs to the user (admins see all), else None"""
+    jobs = Job.objects.all() if request.user.is_admin() else Job.objects.filter(created_by=request.user)
+    return jobs.filter(pk=pk).first()
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def job_list_create(request):
+    """
+    List the user's recent jobs, or queue a report to run in the background.
+
+    POST {"report": "partner_ledger", "query": {"partner_id": 3, "format": "csv"}}
+    runs the report endpoint of that name with the query parameters given.
+    Any report URL also accepts ?async=true to the same effect.
+    """
+    if request.method == 'GET':
+        jobs = Job.objects.filter(created_by=request.user)[:50]
+        return Response(JobSerializer(jobs, many=True, context={'request': request}).data)
+    
+    report = request.data.get('report')
+    if report not in REPORT_VIEWS:
+        return Response({'error': f"report must be one of {', '.join(REPORT_VIEWS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    query = request.data.get('query') or {}
+    if not isinstance(query, dict):
+        return Response({'error': 'query must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = submit_job('report', {'report': report, 'query': urlencode(query, doseq=True)}, request.user)
+    return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def job_detail(request, pk):
+    """Status and progress of a background job"""
+    job = _job_for(request, pk)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job, context={'request': request}).data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def job_result(request, pk):
+    """Download the stored result of a finished job"""
+    job = _job_for(request, pk)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status != 'succeeded':
+        return Response({'error': f'Job is {job.status}'}, status=status.HTTP_409_CONFLICT)
+    
+    path = os.path.join(settings.JOB_RESULTS_DIR, job.result_path)
+    if not os.path.exists(path):
+        return Response({'error': 'Job result is no longer available'}, status=status.HTTP_410_GONE)
+    filename = f"{job.params.get('report', job.kind)}-{job.pk}.{job.result_path.rsplit('.', 1)[-1]}"
+    return FileResponse(open(path, 'rb'), content_type=job.result_content_type, as_attachment=True, filename=filename)
@@ -4,6 +4,7 @@ Django settings for shiv_accounts project.
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -128,6 +129,63 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache
+# Summary endpoints are cached per ledger version (see reports.cache). The file
+# cache is shared by all worker processes; tests and DJANGO_CACHE=locmem use an
+# in-process cache instead.
+if os.environ.get('DJANGO_CACHE') == 'locmem' or 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+        }
+    }
+
+SUMMARY_CACHE_TIMEOUT = 300
+
+# Document numbering (see transactions.numbering)
+FISCAL_YEAR_START_MONTH = 4  # April, Indian financial year
+DOCUMENT_NUMBER_BLOCK_SIZE = 20  # Numbers reserved per process at a time; 1 for gap-free series
+
+# Bank statement imports (see transactions.statements)
+STATEMENT_IMPORT_CHUNK_SIZE = 1000  # Lines written per transaction
+STATEMENT_IMPORT_BACKGROUND_BYTES = 256 * 1024  # Larger files are queued as a background job
+
+# Background jobs (see reports.jobs; run with manage.py run_workers)
+JOB_HANDLERS = {
+    'report': 'reports.jobs.run_report',
+    'statement_import': 'transactions.statements.run_import_job',
+    'mark_overdue': 'transactions.overdue.run_sweep_job',
+}
+JOB_RESULTS_DIR = BASE_DIR / 'job_results'
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 30  # Seconds before the first retry, doubled for each one after
+JOB_STALE_AFTER = 3600  # Seconds a job may stay running before a starting worker requeues it
+JOB_WORKER_CONCURRENCY = 4
+
+# Contact typeahead (see master_data.contact_search)
+CONTACT_AUTOCOMPLETE_CACHE_TTL = 30  # Seconds a search's results are reused
+
+# GST rate for codes no row of the hsn_rates table matches (see master_data.gst_rates)
+HSN_DEFAULT_GST_RATE = '18'
+
+# GST portal HSN search, used to refresh the local HSN master (see master_data.gst_client)
+GST_HSN_API_URL = 'https://services.gst.gov.in/commonservices/hsn/search/qsearch'
+GST_HSN_API_TIMEOUT = (3, 10)  # Connect and read timeouts in seconds
+GST_HSN_API_POOL_SIZE = 10  # Kept-alive connections
+GST_HSN_API_MAX_CONCURRENT = 4  # Calls in flight per process; more fall back to local data at once
+GST_HSN_API_CACHE_SIZE = 1000  # Searches remembered per process
+GST_HSN_API_CACHE_TTL = 3600
+GST_HSN_API_NEGATIVE_CACHE_TTL = 60  # Empty answers and errors
+GST_HSN_API_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+GST_HSN_API_RESET_TIMEOUT = 30  # Seconds before a trial call is let through
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
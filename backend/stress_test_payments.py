@@ -15,10 +15,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shiv_accounts.settings')
 django.setup()
 
-from transactions.models import Payment
+from transactions.models import Payment, CustomerInvoice
+from transactions.allocation import record_payment
 from master_data.models import Contact
 from accounts.models import User
 from datetime import date
+from decimal import Decimal
+from django.db import connection
 
 def create_test_payment(thread_id):
     """Create a test payment"""
@@ -82,9 +85,76 @@ def stress_test_payments():
     
     return success_count == num_threads
 
+def contention_test_allocations(num_threads=50, amount=Decimal('10.00')):
+    """Allocate payments to one invoice from many threads at once and check no update is lost"""
+    print(f"\n=== CONTENTION TEST: {num_threads} WRITERS ON ONE INVOICE ===")
+    
+    user = User.objects.first()
+    contact = Contact.objects.filter(type__in=['customer', 'both']).first() or Contact.objects.first()
+    if not user or not contact:
+        print("Missing user or contact")
+        return False
+    
+    invoice = CustomerInvoice.objects.create(
+        customer=contact,
+        invoice_date=date.today(),
+        due_date=date.today(),
+        subtotal=amount * num_threads,
+        grand_total=amount * num_threads,
+        reference='CONTENTION-TEST',
+        created_by=user,
+    )
+    errors = []
+    timings = []
+    barrier = threading.Barrier(num_threads)
+    
+    def worker(thread_id):
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            record_payment('invoice', invoice.id, amount, 'cash', user, reference=f'CONTENTION-{thread_id}')
+            timings.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(f"Thread {thread_id}: {e}")
+        finally:
+            connection.close()
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i + 1,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    invoice.refresh_from_db()
+    allocated = sum(a.allocated_amount for a in invoice.payment_allocations.all())
+    expected = amount * (num_threads - len(errors))
+    
+    print(f"Writers: {num_threads}, failed: {len(errors)}, wall time: {elapsed:.2f}s")
+    if timings:
+        timings.sort()
+        print(f"Per allocation: median {timings[len(timings) // 2] * 1000:.1f}ms, max {timings[-1] * 1000:.1f}ms")
+    print(f"paid_amount: {invoice.paid_amount}, allocations: {allocated}, expected: {expected}")
+    print(f"balance_due: {invoice.balance_due}, status: {invoice.status}")
+    for error in errors[:5]:
+        print(f"  {error}")
+    
+    passed = not errors and invoice.paid_amount == allocated == expected and invoice.balance_due == 0 and invoice.status == 'paid'
+    if passed:
+        print("✅ Contention test PASSED - No lost updates!")
+    else:
+        print("❌ Contention test FAILED - paid_amount does not match the allocations")
+    
+    # Remove the test documents again
+    Payment.objects.filter(reference__startswith='CONTENTION-').delete()
+    invoice.delete()
+    return passed
+
 if __name__ == '__main__':
     print("Stress Testing Payment Creation...")
     stress_test_payments()
+    contention_test_allocations()
     
     # Show all payment numbers created
     print("\n=== ALL PAYMENT NUMBERS ===")
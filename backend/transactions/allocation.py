@@ -0,0 +1,153 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.http import Http404
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from reports.cache import bump_ledger_version
+from .models import CustomerInvoice, VendorBill, Payment, PaymentAllocation
+
+
+TARGETS = {
+    'invoice': (CustomerInvoice, 'customer_invoice', 'customer_payment', 'customer_id'),
+    'bill': (VendorBill, 'vendor_bill', 'vendor_payment', 'vendor_id'),
+}
+
+
+def apply_paid_amount(model, pk, amount):
+    """
+    Add amount to a document's paid_amount in a single UPDATE.
+
+    balance_due and status are derived from the incremented value in the same
+    statement, so concurrent payments against one document never overwrite
+    each other and only the three affected columns are written. Status moves
+    to paid once the document is fully covered and is otherwise left alone,
+    matching CustomerInvoice.save and VendorBill.save.
+    """
+    paid = F('paid_amount') + amount
+    updated = model.objects.filter(pk=pk).update(
+        paid_amount=paid,
+        balance_due=F('grand_total') - paid,
+        status=Case(When(grand_total__lte=paid, then=Value('paid')), default=F('status')),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        transaction.on_commit(bump_ledger_version)
+    return updated
+
+
+def record_payment(target_type, target_id, amount, method, user, payment_date=None, reference=None):
+    """
+    Create a payment for one invoice or bill and allocate it in full.
+
+    The document row is written before anything is read, so the transaction
+    holds the document's row (or, on SQLite, the database write lock) from
+    its first statement and concurrent allocations queue instead of failing.
+    """
+    model, allocation_field, payment_type, contact_field = TARGETS[target_type]
+    with transaction.atomic():
+        if not apply_paid_amount(model, target_id, amount):
+            raise Http404(f'No {target_type} matches the given query.')
+        contact_id = model.objects.values_list(contact_field, flat=True).get(pk=target_id)
+        payment = Payment.objects.create(
+            payment_type=payment_type,
+            contact_id=contact_id,
+            payment_date=payment_date or timezone.now().date(),
+            payment_method=method,
+            amount=amount,
+            reference=reference,
+            created_by=user,
+        )
+        PaymentAllocation.objects.create(
+            payment=payment,
+            allocated_amount=amount,
+            **{f'{allocation_field}_id': target_id}
+        )
+    return payment
+
+
+OPEN_STATUSES = ['pending', 'overdue']
+
+
+def apply_allocations(target_type, allocations):
+    """
+    Record (payment, document, amount) allocations against locked documents.
+
+    The allocation rows go out in one bulk insert and the documents' paid
+    amount, balance and status in one bulk update.
+    """
+    if not allocations:
+        return []
+    model, allocation_field, _, _ = TARGETS[target_type]
+    now = timezone.now()
+    rows = []
+    documents = {}
+    for payment, document, amount in allocations:
+        document.paid_amount += amount
+        document.balance_due = document.grand_total - document.paid_amount
+        if document.paid_amount >= document.grand_total:
+            document.status = 'paid'
+        document.updated_at = now
+        documents[document.pk] = document
+        rows.append(PaymentAllocation(payment=payment, allocated_amount=amount, **{allocation_field: document}))
+
+    PaymentAllocation.objects.bulk_create(rows)
+    model.objects.bulk_update(list(documents.values()), ['paid_amount', 'balance_due', 'status', 'updated_at'])
+    transaction.on_commit(bump_ledger_version)
+    return rows
+
+
+def allocate_payment(payment_id, targets=None):
+    """
+    Spread an existing payment over several invoices or bills of its contact.
+
+    targets is a list of (document id, amount) pairs; without it the
+    contact's open documents are settled oldest due date first until the
+    unallocated part of the payment runs out. The open documents are fetched
+    once under a row lock, the allocations go out in one bulk insert and the
+    documents' paid amount, balance and status in one bulk update.
+    """
+    with transaction.atomic():
+        # Touch the payment first so the transaction holds the write lock from the start
+        if not Payment.objects.filter(pk=payment_id).update(updated_at=timezone.now()):
+            raise Http404('No payment matches the given query.')
+        payment = Payment.objects.get(pk=payment_id)
+        target_type = 'invoice' if payment.payment_type == 'customer_payment' else 'bill'
+        model, _, _, contact_field = TARGETS[target_type]
+
+        allocated = payment.allocations.aggregate(total=Sum('allocated_amount'))['total'] or Decimal('0')
+        available = payment.amount - allocated
+        if available <= 0:
+            raise ValidationError({'error': 'Payment is already fully allocated'})
+
+        documents = model.objects.select_for_update().filter(
+            **{contact_field: payment.contact_id},
+            status__in=OPEN_STATUSES,
+            balance_due__gt=0,
+        )
+        if targets is None:
+            documents = list(documents.order_by('due_date', 'id'))
+            plan = []
+            for document in documents:
+                if available <= 0:
+                    break
+                amount = min(document.balance_due, available)
+                plan.append((document, amount))
+                available -= amount
+        else:
+            by_id = documents.in_bulk([target_id for target_id, _ in targets])
+            missing = sorted({target_id for target_id, _ in targets} - set(by_id))
+            if missing:
+                raise ValidationError({'error': f"No open {target_type} for this contact: {', '.join(str(pk) for pk in missing)}"})
+            plan = [(by_id[target_id], amount) for target_id, amount in targets]
+            if sum(amount for _, amount in plan) > available:
+                raise ValidationError({'error': f'Allocations exceed the unallocated amount of {available}'})
+
+        remaining = {}
+        for document, amount in plan:
+            left = remaining.get(document.pk, document.balance_due)
+            if amount <= 0 or amount > left:
+                raise ValidationError({'error': f'Invalid amount {amount} for {target_type} {document.pk}'})
+            remaining[document.pk] = left - amount
+        allocations = apply_allocations(target_type, [(payment, document, amount) for document, amount in plan])
+    return allocations
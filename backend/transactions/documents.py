@@ -0,0 +1,147 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from master_data.models import Product
+from reports.cache import bump_period_versions
+from reports.journal import as_date, month_start
+
+
+TWO_PLACES = Decimal('0.01')
+
+LINE_FIELDS = ['product_id', 'quantity', 'unit_price', 'tax_percent', 'tax_amount', 'total']
+
+# Document date of the line items read by the per-month GST summaries (reports.gst)
+PERIOD_DATE_FIELDS = {'customer_invoice': 'invoice_date', 'vendor_bill': 'bill_date'}
+
+
+def line_values(item):
+    """Quantity, price, tax and totals of one line item payload"""
+    qty = Decimal(str(item.get('quantity', '0')))
+    price = Decimal(str(item.get('unit_price', '0')))
+    tax_pct = Decimal(str(item.get('tax_percent', '0')))
+    line_sub = qty * price
+    line_tax = (line_sub * tax_pct) / Decimal('100')
+    return {
+        'product_id': int(item.get('product_id')),
+        'quantity': qty.quantize(TWO_PLACES),
+        'unit_price': price.quantize(TWO_PLACES),
+        'tax_percent': tax_pct.quantize(TWO_PLACES),
+        'tax_amount': line_tax.quantize(TWO_PLACES),
+        'total': (line_sub + line_tax).quantize(TWO_PLACES),
+    }
+
+
+def resolve_products(items):
+    """Check every referenced product exists with one query, reporting all missing ids together"""
+    try:
+        product_ids = {int(item.get('product_id')) for item in items}
+    except (TypeError, ValueError):
+        raise NotFound('Every line item needs a valid product_id')
+    products = Product.objects.in_bulk(product_ids)
+    missing = sorted(product_ids - set(products))
+    if missing:
+        raise NotFound(f"Products not found: {', '.join(str(pk) for pk in missing)}")
+    return products
+
+
+def _key(values):
+    return tuple(values[field] for field in LINE_FIELDS)
+
+
+def lines_changed(document, parent_field):
+    """
+    Invalidate cached results over the month of a document whose line items were written.
+
+    Line edits that leave the document totals alone (another product, 2 @ 50
+    made 1 @ 100) move no account balance, so the journal does not bump the
+    month's version for them.
+    """
+    date_field = PERIOD_DATE_FIELDS.get(parent_field)
+    if date_field:
+        month = month_start(as_date(getattr(document, date_field)))
+        transaction.on_commit(lambda: bump_period_versions([month]))
+
+
+def create_lines(document, items, line_model, parent_field):
+    """Insert the line items of a new document in one statement"""
+    resolve_products(items)
+    line_model.objects.bulk_create([
+        line_model(**{parent_field: document}, **line_values(item)) for item in items
+    ])
+    lines_changed(document, parent_field)
+
+
+def write_lines(document, items, line_model, parent_field):
+    """
+    Make a document's line items match the payload with as few statements as possible.
+
+    Lines are matched by id when the payload carries one, then by identical
+    content, and the rest are rewritten in place. Unchanged lines are left
+    alone, changed ones go out in one bulk update, new ones in one bulk
+    insert and surplus ones in one delete.
+    """
+    resolve_products(items)
+    wanted = [(item.get('id'), line_values(item)) for item in items]
+    existing = {line.pk: line for line in line_model.objects.filter(**{parent_field: document})}
+
+    pairs = []
+    unmatched = []
+    for line_id, values in wanted:
+        line = existing.pop(line_id, None) if line_id else None
+        if line is not None:
+            pairs.append((line, values))
+        else:
+            unmatched.append(values)
+
+    # Identical lines need no write at all
+    by_content = {}
+    for line in existing.values():
+        by_content.setdefault(_key({field: getattr(line, field) for field in LINE_FIELDS}), []).append(line)
+    remaining = []
+    for values in unmatched:
+        same = by_content.get(_key(values))
+        if same:
+            line = same.pop()
+            existing.pop(line.pk)
+        else:
+            remaining.append(values)
+
+    # Reuse leftover rows for changed lines before inserting or deleting any
+    leftovers = list(existing.values())
+    for line, values in zip(leftovers, remaining):
+        pairs.append((line, values))
+    to_insert = remaining[len(leftovers):]
+    to_delete = [line.pk for line in leftovers[len(remaining):]]
+
+    changed = []
+    for line, values in pairs:
+        if any(getattr(line, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(line, field, value)
+            changed.append(line)
+
+    if changed:
+        line_model.objects.bulk_update(changed, LINE_FIELDS)
+    if to_insert:
+        line_model.objects.bulk_create([line_model(**{parent_field: document}, **values) for values in to_insert])
+    if to_delete:
+        line_model.objects.filter(pk__in=to_delete).delete()
+    if changed or to_insert or to_delete:
+        lines_changed(document, parent_field)
+
+
+def copy_lines(source_lines, document, line_model, parent_field):
+    """Copy the lines of an order onto the document it is converted into, in one insert"""
+    line_model.objects.bulk_create([
+        line_model(**{parent_field: document}, **{field: getattr(line, field) for field in LINE_FIELDS})
+        for line in source_lines
+    ])
+    lines_changed(document, parent_field)
+
+
+def prefetch_lines(document):
+    """Load a document's lines with their products in one query before it is serialized"""
+    line_model = document.items.model
+    prefetch_related_objects([document], Prefetch('items', queryset=line_model.objects.select_related('product')))
+    return document
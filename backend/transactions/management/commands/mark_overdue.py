@@ -0,0 +1,23 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from reports.jobs import submit_job
+from transactions.overdue import sweep_overdue
+
+
+class Command(BaseCommand):
+    help = 'Mark unpaid invoices and bills past their due date as overdue (and undo it when the due date moved)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Date to sweep as of (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--queue', action='store_true', help='Queue the sweep for run_workers instead of running it here')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            job = submit_job('mark_overdue', {'date': options['date']} if options['date'] else {})
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk}'))
+            return
+        today = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else None
+        result = sweep_overdue(today)
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {result['invoices']} invoices and {result['bills']} bills in {result['seconds']}s"
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_payment_notes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['-invoice_date', '-created_at', '-id'], name='cust_invoice_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date', '-created_at', '-id'], name='payment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['-po_date', '-created_at', '-id'], name='po_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['-so_date', '-created_at', '-id'], name='so_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['-bill_date', '-created_at', '-id'], name='vendor_bill_keyset_idx'),
+        ),
+    ]
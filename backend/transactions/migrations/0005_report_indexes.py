@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['status', 'invoice_date'], name='cust_inv_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['customer', 'invoice_date'], name='cust_inv_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(fields=['status', 'grand_total', 'balance_due'], name='cust_inv_status_amt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerinvoice',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-invoice_date'], name='cust_inv_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_type', 'amount'], name='payment_type_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['contact', 'payment_date'], name='payment_contact_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status'], name='po_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['status'], name='so_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['status', 'bill_date'], name='vendor_bill_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['vendor', 'bill_date'], name='vendor_bill_vendor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(fields=['status', 'grand_total', 'balance_due'], name='vendor_bill_status_amt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorbill',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-bill_date'], name='vendor_bill_pending_idx'),
+        ),
+    ]
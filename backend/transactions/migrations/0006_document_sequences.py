@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_report_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('sales_order', 'Sales Order'), ('purchase_order', 'Purchase Order'), ('customer_invoice', 'Customer Invoice'), ('vendor_bill', 'Vendor Bill'), ('payment', 'Payment')], max_length=20)),
+                ('fiscal_year', models.PositiveSmallIntegerField()),
+                ('next_value', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'document_sequences',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.UniqueConstraint(fields=('document_type', 'fiscal_year'), name='document_sequence_uniq'),
+        ),
+    ]
@@ -4,6 +4,18 @@ from master_data.models import Contact, Product, Tax, ChartOfAccount
 from accounts.models import User
 
 
+class PurchaseOrderQuerySet(models.QuerySet):
+    """Purchase Order queries"""
+    
+    def with_bill_totals(self):
+        """Annotate the count, total and paid amount of the related vendor bills"""
+        return self.annotate(
+            bill_count=models.Count('vendor_bills'),
+            billed_total=models.Sum('vendor_bills__grand_total'),
+            bill_paid_total=models.Sum('vendor_bills__paid_amount'),
+        )
+
+
 class PurchaseOrder(models.Model):
     """Purchase Order model"""
     
@@ -26,45 +38,52 @@ class PurchaseOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PurchaseOrderQuerySet.as_manager()
+    
     class Meta:
         db_table = 'purchase_orders'
         ordering = ['-po_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-po_date', '-created_at', '-id'], name='po_keyset_idx'),
+            models.Index(fields=['status'], name='po_status_idx'),
+        ]
     
     def __str__(self):
         return f"PO-{self.po_number} - {self.vendor.name}"
     
+    def save(self, *args, **kwargs):
+        if not self.po_number:
+            from .numbering import next_number
+            self.po_number = next_number('purchase_order', self.po_date)
+        super().save(*args, **kwargs)
+    
+    def bill_totals(self):
+        """(count, total, paid) of the related vendor bills, from list annotations when present"""
+        if hasattr(self, 'bill_count'):
+            return self.bill_count, self.billed_total or 0, self.bill_paid_total or 0
+        totals = self.vendor_bills.aggregate(
+            count=models.Count('id'),
+            total=models.Sum('grand_total'),
+            paid=models.Sum('paid_amount'),
+        )
+        return totals['count'], totals['total'] or 0, totals['paid'] or 0
+    
+    @staticmethod
+    def _is_fully_paid(count, total, paid):
+        return count > 0 and total > 0 and paid >= total
+    
     @property
     def is_fully_paid(self):
         """Check if this purchase order is fully paid via vendor bills"""
-        # If no vendor bills exist, it's not paid
-        if not self.vendor_bills.exists():
-            return False
-        
-        # Calculate total paid amount from all related vendor bills
-        total_bill_amount = self.vendor_bills.aggregate(
-            total=models.Sum('grand_total')
-        )['total'] or 0
-        
-        total_paid_amount = self.vendor_bills.aggregate(
-            total=models.Sum('paid_amount')
-        )['total'] or 0
-        
-        # Check if all bills are paid (paid amount >= bill amount)
-        return total_paid_amount >= total_bill_amount and total_bill_amount > 0
+        return self._is_fully_paid(*self.bill_totals())
     
     @property 
     def payment_status(self):
         """Get payment status string"""
-        if not self.vendor_bills.exists():
-            return 'unpaid'
-        elif self.is_fully_paid:
+        count, total, paid = self.bill_totals()
+        if self._is_fully_paid(count, total, paid):
             return 'paid'
-        else:
-            # Check if partially paid
-            total_paid = self.vendor_bills.aggregate(
-                total=models.Sum('paid_amount')
-            )['total'] or 0
-            return 'partial' if total_paid > 0 else 'unpaid'
+        return 'partial' if count and paid > 0 else 'unpaid'
 
 
 class PurchaseOrderItem(models.Model):
@@ -113,11 +132,26 @@ class VendorBill(models.Model):
     class Meta:
         db_table = 'vendor_bills'
         ordering = ['-bill_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-bill_date', '-created_at', '-id'], name='vendor_bill_keyset_idx'),
+            models.Index(fields=['status', 'bill_date'], name='vendor_bill_status_date_idx'),
+            models.Index(fields=['vendor', 'bill_date'], name='vendor_bill_vendor_date_idx'),
+            # Covers the dashboard's per-status counts and sums without touching the table
+            models.Index(fields=['status', 'grand_total', 'balance_due'], name='vendor_bill_status_amt_idx'),
+            # Open payables only
+            models.Index(fields=['-bill_date'], condition=models.Q(status='pending'), name='vendor_bill_pending_idx'),
+            # Overdue sweep (transactions.overdue)
+            models.Index(fields=['status', 'due_date'], name='vendor_bill_status_due_idx'),
+        ]
     
     def __str__(self):
         return f"Bill-{self.bill_number} - {self.vendor.name}"
     
     def save(self, *args, **kwargs):
+        if not self.bill_number:
+            from .numbering import next_number
+            self.bill_number = next_number('vendor_bill', self.bill_date)
+        
         self.balance_due = self.grand_total - self.paid_amount
         
         # Auto-update status based on payment
@@ -149,6 +183,18 @@ class VendorBillItem(models.Model):
         return f"{self.product.name} - {self.quantity} x {self.unit_price}"
 
 
+class SalesOrderQuerySet(models.QuerySet):
+    """Sales Order queries"""
+    
+    def with_invoice_totals(self):
+        """Annotate the count, total and paid amount of the related customer invoices"""
+        return self.annotate(
+            invoice_count=models.Count('customer_invoices'),
+            invoiced_total=models.Sum('customer_invoices__grand_total'),
+            invoice_paid_total=models.Sum('customer_invoices__paid_amount'),
+        )
+
+
 class SalesOrder(models.Model):
     """Sales Order model"""
     
@@ -171,45 +217,52 @@ class SalesOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = SalesOrderQuerySet.as_manager()
+    
     class Meta:
         db_table = 'sales_orders'
         ordering = ['-so_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-so_date', '-created_at', '-id'], name='so_keyset_idx'),
+            models.Index(fields=['status'], name='so_status_idx'),
+        ]
     
     def __str__(self):
         return f"SO-{self.so_number} - {self.customer.name}"
     
+    def save(self, *args, **kwargs):
+        if not self.so_number:
+            from .numbering import next_number
+            self.so_number = next_number('sales_order', self.so_date)
+        super().save(*args, **kwargs)
+    
+    def invoice_totals(self):
+        """(count, total, paid) of the related customer invoices, from list annotations when present"""
+        if hasattr(self, 'invoice_count'):
+            return self.invoice_count, self.invoiced_total or 0, self.invoice_paid_total or 0
+        totals = self.customer_invoices.aggregate(
+            count=models.Count('id'),
+            total=models.Sum('grand_total'),
+            paid=models.Sum('paid_amount'),
+        )
+        return totals['count'], totals['total'] or 0, totals['paid'] or 0
+    
+    @staticmethod
+    def _is_fully_paid(count, total, paid):
+        return count > 0 and total > 0 and paid >= total
+    
     @property
     def is_fully_paid(self):
         """Check if this sales order is fully paid via customer invoices"""
-        # If no customer invoices exist, it's not paid
-        if not self.customer_invoices.exists():
-            return False
-        
-        # Calculate total paid amount from all related customer invoices
-        total_invoice_amount = self.customer_invoices.aggregate(
-            total=models.Sum('grand_total')
-        )['total'] or 0
-        
-        total_paid_amount = self.customer_invoices.aggregate(
-            total=models.Sum('paid_amount')
-        )['total'] or 0
-        
-        # Check if all invoices are paid (paid amount >= invoice amount)
-        return total_paid_amount >= total_invoice_amount and total_invoice_amount > 0
+        return self._is_fully_paid(*self.invoice_totals())
     
     @property 
     def payment_status(self):
         """Get payment status string"""
-        if not self.customer_invoices.exists():
-            return 'unpaid'
-        elif self.is_fully_paid:
+        count, total, paid = self.invoice_totals()
+        if self._is_fully_paid(count, total, paid):
             return 'paid'
-        else:
-            # Check if partially paid
-            total_paid = self.customer_invoices.aggregate(
-                total=models.Sum('paid_amount')
-            )['total'] or 0
-            return 'partial' if total_paid > 0 else 'unpaid'
+        return 'partial' if count and paid > 0 else 'unpaid'
 
 
 class SalesOrderItem(models.Model):
@@ -259,11 +312,26 @@ class CustomerInvoice(models.Model):
     class Meta:
         db_table = 'customer_invoices'
         ordering = ['-invoice_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-invoice_date', '-created_at', '-id'], name='cust_invoice_keyset_idx'),
+            models.Index(fields=['status', 'invoice_date'], name='cust_inv_status_date_idx'),
+            models.Index(fields=['customer', 'invoice_date'], name='cust_inv_customer_date_idx'),
+            # Covers the dashboard's per-status counts and sums without touching the table
+            models.Index(fields=['status', 'grand_total', 'balance_due'], name='cust_inv_status_amt_idx'),
+            # Open receivables only
+            models.Index(fields=['-invoice_date'], condition=models.Q(status='pending'), name='cust_inv_pending_idx'),
+            # Overdue sweep (transactions.overdue)
+            models.Index(fields=['status', 'due_date'], name='cust_inv_status_due_idx'),
+        ]
     
     def __str__(self):
         return f"INV-{self.invoice_number} - {self.customer.name}"
     
     def save(self, *args, **kwargs):
+        if not self.invoice_number:
+            from .numbering import next_number
+            self.invoice_number = next_number('customer_invoice', self.invoice_date)
+        
         self.balance_due = self.grand_total - self.paid_amount
         
         # Auto-update status based on payment
@@ -325,42 +393,17 @@ class Payment(models.Model):
     class Meta:
         db_table = 'payments'
         ordering = ['-payment_date', '-created_at']
+        indexes = [
+            models.Index(fields=['-payment_date', '-created_at', '-id'], name='payment_keyset_idx'),
+            models.Index(fields=['payment_type', 'amount'], name='payment_type_amount_idx'),
+            models.Index(fields=['contact', 'payment_date'], name='payment_contact_date_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        # Auto-generate payment number if not provided
+        # Number from the document sequence so a new payment is a single insert
         if not self.payment_number:
-            from django.db import transaction
-            import time
-            
-            with transaction.atomic():
-                # Use a more robust approach with database locking
-                # Get the current maximum ID to use as a base
-                try:
-                    # Use the auto-increment ID as base for uniqueness
-                    # This ensures even simultaneous requests get different numbers
-                    temp_save = kwargs.get('force_insert', False)
-                    
-                    # First, save with a temporary number to get the ID
-                    temp_number = f'TEMP-{int(time.time() * 1000000)}'
-                    self.payment_number = temp_number
-                    
-                    # Save to get the auto-generated ID
-                    super().save(*args, **kwargs)
-                    
-                    # Now create the final payment number using the ID
-                    timestamp = int(time.time())
-                    final_number = f'PAY-{timestamp}{self.id:04d}'
-                    
-                    # Update with the final number
-                    Payment.objects.filter(id=self.id).update(payment_number=final_number)
-                    self.payment_number = final_number
-                    
-                    return  # Exit early since we've already saved
-                    
-                except Exception as e:
-                    # Fallback to UUID if anything goes wrong
-                    import uuid
-                    self.payment_number = f'PAY-{uuid.uuid4().hex[:12].upper()}'
+            from .numbering import next_number
+            self.payment_number = next_number('payment', self.payment_date)
         
         super().save(*args, **kwargs)
     
@@ -385,3 +428,61 @@ class PaymentAllocation(models.Model):
         elif self.vendor_bill:
             return f"Payment allocation for Bill {self.vendor_bill.bill_number}"
         return f"Payment allocation {self.id}"
+
+
+class DocumentSequence(models.Model):
+    """Next free document number per document type and fiscal year"""
+    
+    DOCUMENT_TYPE_CHOICES = [
+        ('sales_order', 'Sales Order'),
+        ('purchase_order', 'Purchase Order'),
+        ('customer_invoice', 'Customer Invoice'),
+        ('vendor_bill', 'Vendor Bill'),
+        ('payment', 'Payment'),
+    ]
+    
+    document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPE_CHOICES)
+    fiscal_year = models.PositiveSmallIntegerField()  # Calendar year the fiscal year starts in
+    next_value = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        constraints = [
+            models.UniqueConstraint(fields=['document_type', 'fiscal_year'], name='document_sequence_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.document_type} FY{self.fiscal_year} - next {self.next_value}"
+
+
+class StatementImport(models.Model):
+    """Bank statement file imported as payments"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    file = models.FileField(upload_to='statement_imports/')
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_lines = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    unallocated_count = models.PositiveIntegerField(default=0)  # Payment created, no document matched
+    unmatched_count = models.PositiveIntegerField(default=0)  # No payment created
+    matched_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    results = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='statement_imports')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'statement_imports'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.file_name} - {self.status}"
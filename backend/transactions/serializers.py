@@ -2,7 +2,7 @@ from rest_framework import serializers
 from .models import (
     PurchaseOrder, PurchaseOrderItem, VendorBill, VendorBillItem,
     SalesOrder, SalesOrderItem, CustomerInvoice, CustomerInvoiceItem,
-    Payment, PaymentAllocation
+    Payment, PaymentAllocation, StatementImport
 )
 from master_data.serializers import ContactListSerializer, ProductListSerializer
 
@@ -170,7 +170,8 @@ class PurchaseOrderListSerializer(serializers.ModelSerializer):
     
     def get_has_vendor_bills(self, obj):
         """Check if this PO has been converted to vendor bills"""
-        return obj.vendor_bills.exists()
+        count, total, paid = obj.bill_totals()
+        return count > 0
 
 
 class VendorBillListSerializer(serializers.ModelSerializer):
@@ -196,7 +197,8 @@ class SalesOrderListSerializer(serializers.ModelSerializer):
     
     def get_has_customer_invoices(self, obj):
         """Check if this SO has been converted to customer invoices"""
-        return obj.customer_invoices.exists()
+        count, total, paid = obj.invoice_totals()
+        return count > 0
 
 
 class CustomerInvoiceListSerializer(serializers.ModelSerializer):
@@ -215,3 +217,15 @@ class PaymentListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ['id', 'payment_number', 'payment_type', 'contact_name', 'payment_date', 'payment_method', 'amount']
+
+
+class StatementImportSerializer(serializers.ModelSerializer):
+    """Serializer for bank statement imports"""
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = StatementImport
+        fields = ['id', 'file_name', 'status', 'total_lines', 'matched_count', 'unallocated_count',
+                 'unmatched_count', 'matched_amount', 'results', 'error', 'created_by_name',
+                 'created_at', 'completed_at']
+        read_only_fields = fields
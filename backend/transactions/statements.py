@@ -0,0 +1,297 @@
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from master_data.models import Contact
+from reports import journal
+from reports.cache import bump_ledger_version
+from reports.jobs import PermanentJobError, set_progress, submit_job
+from .allocation import OPEN_STATUSES, TARGETS, apply_allocations
+from .models import Payment, StatementImport
+from .numbering import fiscal_year, next_numbers
+
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y']
+PAYMENT_METHODS = {value for value, label in Payment.PAYMENT_METHOD_CHOICES}
+TOKEN = re.compile(r'[A-Za-z0-9][A-Za-z0-9/-]*')
+
+
+def normalize(value):
+    """Comparison key for names, references and document numbers"""
+    return re.sub(r'[^a-z0-9]', '', (value or '').lower())
+
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised date {value!r}')
+
+
+def parse_amount(value):
+    try:
+        return Decimal(value.replace(',', '')) if value else Decimal('0')
+    except InvalidOperation:
+        raise ValueError(f'Unrecognised amount {value!r}')
+
+
+def parse_line(row):
+    """
+    Read one statement row into a dict.
+
+    Headers are matched case-insensitively. The amount comes from an amount
+    column (credits positive) or from separate credit and debit columns.
+    """
+    row = {normalize(key): (value or '').strip() for key, value in row.items() if key}
+    if 'amount' in row:
+        amount = parse_amount(row['amount'])
+    else:
+        amount = parse_amount(row.get('credit')) - parse_amount(row.get('debit'))
+    if not amount:
+        raise ValueError('Zero amount')
+    method = row.get('paymentmethod', '').lower()
+    return {
+        'date': parse_date(row.get('date', '')),
+        'side': 'invoice' if amount > 0 else 'bill',
+        'amount': abs(amount).quantize(Decimal('0.01')),
+        'reference': row.get('reference', ''),
+        'description': row.get('description', ''),
+        'contact': row.get('contact', ''),
+        'gst_number': row.get('gstnumber', ''),
+        'method': method if method in PAYMENT_METHODS else 'bank',
+    }
+
+
+class MatchIndex:
+    """
+    Hash indexes over contacts and open invoices/bills, built once per import.
+
+    Every statement line is then matched with dictionary lookups: first by a
+    document number or reference quoted on the line, then by contact and
+    exact balance. A matched document is taken out of the indexes so no two
+    lines settle the same one.
+    """
+
+    def __init__(self):
+        self.contacts_by_gst = {}
+        self.contacts_by_name = {}
+        ambiguous = set()
+        for contact_id, name, contact_type, gst_number in Contact.objects.filter(is_active=True).values_list(
+            'id', 'name', 'type', 'gst_number'
+        ):
+            if gst_number:
+                self.contacts_by_gst[normalize(gst_number)] = contact_id
+            sides = ['invoice', 'bill'] if contact_type == 'both' else ['invoice' if contact_type == 'customer' else 'bill']
+            for side in sides:
+                key = (side, normalize(name))
+                if key in self.contacts_by_name:
+                    ambiguous.add(key)
+                self.contacts_by_name[key] = contact_id
+        for key in ambiguous:
+            del self.contacts_by_name[key]
+
+        self.by_number = {}
+        self.by_reference = defaultdict(list)
+        self.by_contact_amount = defaultdict(list)
+        self.used = set()
+        for side, (model, _, _, contact_field) in TARGETS.items():
+            number_field = 'invoice_number' if side == 'invoice' else 'bill_number'
+            for document in model.objects.filter(status__in=OPEN_STATUSES, balance_due__gt=0).order_by('due_date', 'id'):
+                self.by_number[(side, normalize(getattr(document, number_field)))] = document
+                if getattr(document, 'reference', None):
+                    self.by_reference[(side, normalize(document.reference))].append(document)
+                self.by_contact_amount[(side, getattr(document, contact_field), document.balance_due)].append(document)
+
+    def contact_for(self, line):
+        if line['gst_number']:
+            contact_id = self.contacts_by_gst.get(normalize(line['gst_number']))
+            if contact_id:
+                return contact_id
+        if line['contact']:
+            return self.contacts_by_name.get((line['side'], normalize(line['contact'])))
+        return None
+
+    def _available(self, documents, line, contact_id):
+        contact_field = TARGETS[line['side']][3]
+        for document in documents:
+            if (line['side'], document.pk) in self.used or document.balance_due != line['amount']:
+                continue
+            if contact_id and getattr(document, contact_field) != contact_id:
+                continue
+            return document
+        return None
+
+    def match(self, line):
+        """Open document and contact id for a statement line; either may be None"""
+        side = line['side']
+        contact_id = self.contact_for(line)
+        keys = [normalize(line['reference'])] + [normalize(token) for token in TOKEN.findall(line['description'])]
+        document = None
+        for key in filter(None, keys):
+            candidates = [self.by_number[(side, key)]] if (side, key) in self.by_number else []
+            document = self._available(candidates + self.by_reference.get((side, key), []), line, contact_id)
+            if document:
+                break
+        if document is None and contact_id:
+            document = self._available(self.by_contact_amount.get((side, contact_id, line['amount']), []), line, contact_id)
+        if document is not None:
+            self.used.add((side, document.pk))
+            contact_id = getattr(document, TARGETS[side][3])
+        return document, contact_id
+
+
+def _import_chunk(statement_import, index, rows, user):
+    """Create the payments and allocations of one chunk of statement rows in a single transaction"""
+    results = {'matched': [], 'unallocated': [], 'unmatched': []}
+    lines = []
+    for number, row in rows:
+        try:
+            line = parse_line(row)
+        except ValueError as exc:
+            results['unmatched'].append({'line': number, 'reason': str(exc)})
+            continue
+        document, contact_id = index.match(line)
+        if contact_id is None:
+            results['unmatched'].append({
+                'line': number, 'date': line['date'].isoformat(), 'amount': str(line['amount']),
+                'reference': line['reference'], 'reason': 'No matching contact or document',
+            })
+            continue
+        lines.append((number, line, document, contact_id))
+
+    with transaction.atomic():
+        # Record progress first so the transaction holds the write lock from the start
+        StatementImport.objects.filter(pk=statement_import.pk).update(total_lines=F('total_lines') + len(rows))
+
+        # Re-read the matched documents under lock; any paid since the index was built drop out
+        locked = {}
+        for side, (model, _, _, _) in TARGETS.items():
+            ids = [document.pk for number, line, document, contact_id in lines if document and line['side'] == side]
+            locked[side] = model.objects.select_for_update().in_bulk(ids) if ids else {}
+
+        by_year = defaultdict(list)
+        for entry in lines:
+            by_year[fiscal_year(entry[1]['date'])].append(entry)
+        payments = []
+        for year_lines in by_year.values():
+            numbers = next_numbers('payment', year_lines[0][1]['date'], len(year_lines))
+            for (number, line, document, contact_id), payment_number in zip(year_lines, numbers):
+                payments.append((number, line, document, Payment(
+                    payment_number=payment_number,
+                    payment_type=TARGETS[line['side']][2],
+                    contact_id=contact_id,
+                    payment_date=line['date'],
+                    payment_method=line['method'],
+                    amount=line['amount'],
+                    reference=line['reference'][:255] or None,
+                    notes=line['description'] or None,
+                    created_by=user,
+                )))
+        if payments:
+            Payment.objects.bulk_create([payment for number, line, document, payment in payments])
+            journal.post_documents('payment', [payment for number, line, document, payment in payments])
+
+        allocations = defaultdict(list)
+        for number, line, document, payment in payments:
+            fresh = locked[line['side']].get(document.pk) if document else None
+            if fresh is not None and fresh.status in OPEN_STATUSES and fresh.balance_due == line['amount']:
+                allocations[line['side']].append((payment, fresh, line['amount']))
+                results['matched'].append({
+                    'line': number, 'payment_number': payment.payment_number, 'amount': str(line['amount']),
+                    'document': getattr(fresh, 'invoice_number', None) or fresh.bill_number,
+                })
+            else:
+                results['unallocated'].append({
+                    'line': number, 'payment_number': payment.payment_number, 'amount': str(line['amount']),
+                    'reason': 'Document no longer open' if document else 'No open document with this amount',
+                })
+        for side, side_allocations in allocations.items():
+            apply_allocations(side, side_allocations)
+        if payments:
+            transaction.on_commit(bump_ledger_version)
+    return results
+
+
+def run_import(import_id, progress=None):
+    """
+    Parse a stored statement file in chunks and import every line.
+
+    Chunks are committed one by one; if a chunk fails the import is marked
+    failed with the error and the chunks before it stay imported. progress,
+    when given, is called after every chunk with the percentage of the file
+    read and a message.
+
+    Only a queued import is run, so an import that has already started (and
+    may have committed chunks) is never imported twice. Returns whether it
+    ran.
+    """
+    if not StatementImport.objects.filter(pk=import_id, status='queued').update(status='running', total_lines=0):
+        return False
+    statement_import = StatementImport.objects.select_related('created_by').get(pk=import_id)
+    chunk_size = getattr(settings, 'STATEMENT_IMPORT_CHUNK_SIZE', 1000)
+    results = {'matched': [], 'unallocated': [], 'unmatched': []}
+
+    def collect(chunk_results):
+        for key, value in chunk_results.items():
+            results[key] += value
+
+    try:
+        index = MatchIndex()
+        size = statement_import.file.size or 1
+        with statement_import.file.open('rb') as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            chunk = []
+            for number, row in enumerate(reader, start=2):
+                chunk.append((number, row))
+                if len(chunk) >= chunk_size:
+                    collect(_import_chunk(statement_import, index, chunk, statement_import.created_by))
+                    chunk = []
+                    if progress:
+                        progress(raw.tell() * 100 // size, f'{number - 1} lines imported')
+            if chunk:
+                collect(_import_chunk(statement_import, index, chunk, statement_import.created_by))
+    except Exception as exc:
+        StatementImport.objects.filter(pk=import_id).update(status='failed', error=str(exc), completed_at=timezone.now())
+        return True
+
+    StatementImport.objects.filter(pk=import_id).update(
+        status='completed',
+        matched_count=len(results['matched']),
+        unallocated_count=len(results['unallocated']),
+        unmatched_count=len(results['unmatched']),
+        matched_amount=sum((Decimal(item['amount']) for item in results['matched']), Decimal('0')),
+        results=results,
+        completed_at=timezone.now(),
+    )
+    return True
+
+
+def run_import_job(job, import_id):
+    """Job handler for imports queued by start_import"""
+    if not run_import(import_id, progress=lambda percent, message: set_progress(job, percent, message)):
+        raise PermanentJobError(f'Statement import {import_id} is not queued')
+    return StatementImport.objects.filter(pk=import_id).values(
+        'id', 'status', 'total_lines', 'matched_count', 'unallocated_count', 'unmatched_count', 'error'
+    ).get()
+
+
+def start_import(statement_import):
+    """
+    Import a stored statement now, or queue it for manage.py run_workers
+    when the file is large.
+
+    Returns True when the import already ran.
+    """
+    if statement_import.file.size > getattr(settings, 'STATEMENT_IMPORT_BACKGROUND_BYTES', 256 * 1024):
+        submit_job('statement_import', {'import_id': statement_import.pk}, statement_import.created_by, max_attempts=1)
+        return False
+    run_import(statement_import.pk)
+    return True
@@ -23,6 +23,9 @@ urlpatterns = [
     path('payments/', views.PaymentListCreateView.as_view(), name='payment-list-create'),
     path('payments/<int:pk>/', views.PaymentDetailView.as_view(), name='payment-detail'),
     path('payments/quick-allocate/', views.quick_allocate_payment, name='quick-allocate-payment'),
+    path('payments/<int:pk>/allocate/', views.allocate_payment_to_documents, name='allocate-payment'),
+    path('statement-imports/', views.import_bank_statement, name='statement-import'),
+    path('statement-imports/<int:pk>/', views.bank_statement_import_detail, name='statement-import-detail'),
     
     # Contact User URLs
     path('contact-user/invoices/', views.contact_user_invoices, name='contact-user-invoices'),
@@ -3,37 +3,60 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q, Sum, F
+from django.db.models import Q, Prefetch
 from django.utils import timezone
 from datetime import datetime, timedelta
 from .models import (
     PurchaseOrder, PurchaseOrderItem, VendorBill, VendorBillItem,
     SalesOrder, SalesOrderItem, CustomerInvoice, CustomerInvoiceItem,
-    Payment, PaymentAllocation
+    Payment, PaymentAllocation, StatementImport
 )
 from .serializers import (
     PurchaseOrderSerializer, PurchaseOrderListSerializer, PurchaseOrderItemSerializer,
     VendorBillSerializer, VendorBillListSerializer, VendorBillItemSerializer,
     SalesOrderSerializer, SalesOrderListSerializer, SalesOrderItemSerializer,
     CustomerInvoiceSerializer, CustomerInvoiceListSerializer, CustomerInvoiceItemSerializer,
-    PaymentSerializer, PaymentListSerializer, PaymentAllocationSerializer
+    PaymentSerializer, PaymentListSerializer, PaymentAllocationSerializer, StatementImportSerializer
+)
+from master_data.models import Contact
+from reports.stock import post_vendor_bill, post_customer_invoice
+from reports.cache import cached_summary
+from reports.streaming import ExportMixin
+from .pagination import KeysetPagination
+from .documents import create_lines, write_lines, copy_lines, prefetch_lines
+from .allocation import record_payment, allocate_payment
+from .statements import start_import
+from reports.metrics import (
+    invoice_metrics, bill_metrics, payment_metrics, sales_order_metrics, purchase_order_metrics
 )
-from master_data.models import Contact, Product
 from django.shortcuts import get_object_or_404
 from django.db import transaction as db_transaction
 from decimal import Decimal
 
 
 # Purchase Order Views
-class PurchaseOrderListCreateView(generics.ListCreateAPIView):
+class PurchaseOrderListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating purchase orders"""
-    queryset = PurchaseOrder.objects.all()
+    queryset = PurchaseOrder.objects.select_related('vendor').with_bill_totals()
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'vendor']
     search_fields = ['po_number', 'vendor__name']
     ordering_fields = ['po_date', 'created_at', 'grand_total']
-    ordering = ['-po_date', '-created_at']
+    ordering = ['-po_date', '-created_at', '-id']
+    export_fields = [
+        ('po_number', 'PO Number'),
+        ('vendor__name', 'Vendor'),
+        ('po_date', 'Date'),
+        ('status', 'Status'),
+        ('subtotal', 'Subtotal'),
+        ('tax_total', 'Tax'),
+        ('grand_total', 'Total'),
+        ('bill_count', 'Bills'),
+        ('billed_total', 'Billed'),
+    ]
+    export_name = 'purchase_orders'
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -52,15 +75,29 @@ class PurchaseOrderDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Vendor Bill Views
-class VendorBillListCreateView(generics.ListCreateAPIView):
+class VendorBillListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating vendor bills"""
-    queryset = VendorBill.objects.all()
+    queryset = VendorBill.objects.select_related('vendor')
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'vendor']
     search_fields = ['bill_number', 'vendor__name']
     ordering_fields = ['bill_date', 'created_at', 'grand_total']
-    ordering = ['-bill_date', '-created_at']
+    ordering = ['-bill_date', '-created_at', '-id']
+    export_fields = [
+        ('bill_number', 'Bill Number'),
+        ('vendor__name', 'Vendor'),
+        ('bill_date', 'Date'),
+        ('due_date', 'Due Date'),
+        ('status', 'Status'),
+        ('subtotal', 'Subtotal'),
+        ('tax_total', 'Tax'),
+        ('grand_total', 'Total'),
+        ('paid_amount', 'Paid'),
+        ('balance_due', 'Balance Due'),
+    ]
+    export_name = 'vendor_bills'
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -76,18 +113,35 @@ class VendorBillDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = VendorBill.objects.all()
     serializer_class = VendorBillSerializer
     permission_classes = [permissions.IsAuthenticated]
+    
+    def perform_update(self, serializer):
+        with db_transaction.atomic():
+            post_vendor_bill(serializer.save())
 
 
 # Sales Order Views
-class SalesOrderListCreateView(generics.ListCreateAPIView):
+class SalesOrderListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating sales orders"""
-    queryset = SalesOrder.objects.all()
+    queryset = SalesOrder.objects.select_related('customer').with_invoice_totals()
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'customer']
     search_fields = ['so_number', 'customer__name']
     ordering_fields = ['so_date', 'created_at', 'grand_total']
-    ordering = ['-so_date', '-created_at']
+    ordering = ['-so_date', '-created_at', '-id']
+    export_fields = [
+        ('so_number', 'SO Number'),
+        ('customer__name', 'Customer'),
+        ('so_date', 'Date'),
+        ('status', 'Status'),
+        ('subtotal', 'Subtotal'),
+        ('tax_total', 'Tax'),
+        ('grand_total', 'Total'),
+        ('invoice_count', 'Invoices'),
+        ('invoiced_total', 'Invoiced'),
+    ]
+    export_name = 'sales_orders'
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -106,15 +160,29 @@ class SalesOrderDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Customer Invoice Views
-class CustomerInvoiceListCreateView(generics.ListCreateAPIView):
+class CustomerInvoiceListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating customer invoices"""
-    queryset = CustomerInvoice.objects.all()
+    queryset = CustomerInvoice.objects.select_related('customer')
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['status', 'customer']
     search_fields = ['invoice_number', 'customer__name']
     ordering_fields = ['invoice_date', 'created_at', 'grand_total']
-    ordering = ['-invoice_date', '-created_at']
+    ordering = ['-invoice_date', '-created_at', '-id']
+    export_fields = [
+        ('invoice_number', 'Invoice Number'),
+        ('customer__name', 'Customer'),
+        ('invoice_date', 'Date'),
+        ('due_date', 'Due Date'),
+        ('status', 'Status'),
+        ('subtotal', 'Subtotal'),
+        ('tax_total', 'Tax'),
+        ('grand_total', 'Total'),
+        ('paid_amount', 'Paid'),
+        ('balance_due', 'Balance Due'),
+    ]
+    export_name = 'customer_invoices'
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -130,18 +198,33 @@ class CustomerInvoiceDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = CustomerInvoice.objects.all()
     serializer_class = CustomerInvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    
+    def perform_update(self, serializer):
+        with db_transaction.atomic():
+            post_customer_invoice(serializer.save())
 
 
 # Payment Views
-class PaymentListCreateView(generics.ListCreateAPIView):
+class PaymentListCreateView(ExportMixin, generics.ListCreateAPIView):
     """View for listing and creating payments"""
-    queryset = Payment.objects.all()
+    queryset = Payment.objects.select_related('contact')
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['payment_type', 'payment_method', 'contact']
     search_fields = ['payment_number', 'contact__name']
     ordering_fields = ['payment_date', 'created_at', 'amount']
-    ordering = ['-payment_date', '-created_at']
+    ordering = ['-payment_date', '-created_at', '-id']
+    export_fields = [
+        ('payment_number', 'Payment Number'),
+        ('payment_type', 'Type'),
+        ('contact__name', 'Contact'),
+        ('payment_date', 'Date'),
+        ('payment_method', 'Method'),
+        ('amount', 'Amount'),
+        ('reference', 'Reference'),
+    ]
+    export_name = 'payments'
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -201,64 +284,74 @@ def contact_user_bills(request):
 # Dashboard and Summary Views
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@cached_summary('transaction_summary')
 def transaction_summary(request):
     """Get transaction summary for dashboard"""
     user = request.user
     
     if user.is_admin() or user.is_invoicing_user():
         # Admin and Invoicing User summary
+        purchase_orders = purchase_order_metrics()
+        bills = bill_metrics()
+        sales_orders = sales_order_metrics()
+        invoices = invoice_metrics()
+        payments = payment_metrics()
         summary = {
             'purchase_orders': {
-                'total': PurchaseOrder.objects.count(),
-                'draft': PurchaseOrder.objects.filter(status='draft').count(),
-                'sent': PurchaseOrder.objects.filter(status='sent').count(),
-                'received': PurchaseOrder.objects.filter(status='received').count(),
+                'total': purchase_orders['total'],
+                'draft': purchase_orders['draft'],
+                'sent': purchase_orders['sent'],
+                'received': purchase_orders['received'],
             },
             'vendor_bills': {
-                'total': VendorBill.objects.count(),
-                'pending': VendorBill.objects.filter(status='pending').count(),
-                'paid': VendorBill.objects.filter(status='paid').count(),
-                'overdue': VendorBill.objects.filter(status='overdue').count(),
-                'total_amount': VendorBill.objects.aggregate(total=Sum('grand_total'))['total'] or 0,
-                'pending_amount': VendorBill.objects.filter(status='pending').aggregate(total=Sum('balance_due'))['total'] or 0,
+                'total': bills['total'],
+                'pending': bills['pending'],
+                'paid': bills['paid'],
+                'overdue': bills['overdue'],
+                'total_amount': bills['total_amount'],
+                'pending_amount': bills['pending_amount'],
+                'overdue_amount': bills['overdue_amount'],
             },
             'sales_orders': {
-                'total': SalesOrder.objects.count(),
-                'draft': SalesOrder.objects.filter(status='draft').count(),
-                'confirmed': SalesOrder.objects.filter(status='confirmed').count(),
-                'delivered': SalesOrder.objects.filter(status='delivered').count(),
+                'total': sales_orders['total'],
+                'draft': sales_orders['draft'],
+                'confirmed': sales_orders['confirmed'],
+                'delivered': sales_orders['delivered'],
             },
             'customer_invoices': {
-                'total': CustomerInvoice.objects.count(),
-                'pending': CustomerInvoice.objects.filter(status='pending').count(),
-                'paid': CustomerInvoice.objects.filter(status='paid').count(),
-                'overdue': CustomerInvoice.objects.filter(status='overdue').count(),
-                'total_amount': CustomerInvoice.objects.aggregate(total=Sum('grand_total'))['total'] or 0,
-                'pending_amount': CustomerInvoice.objects.filter(status='pending').aggregate(total=Sum('balance_due'))['total'] or 0,
+                'total': invoices['total'],
+                'pending': invoices['pending'],
+                'paid': invoices['paid'],
+                'overdue': invoices['overdue'],
+                'total_amount': invoices['total_amount'],
+                'pending_amount': invoices['pending_amount'],
+                'overdue_amount': invoices['overdue_amount'],
             },
             'payments': {
-                'total': Payment.objects.count(),
-                'customer_payments': Payment.objects.filter(payment_type='customer_payment').count(),
-                'vendor_payments': Payment.objects.filter(payment_type='vendor_payment').count(),
-                'total_amount': Payment.objects.aggregate(total=Sum('amount'))['total'] or 0,
+                'total': payments['total'],
+                'customer_payments': payments['customer_payments'],
+                'vendor_payments': payments['vendor_payments'],
+                'total_amount': payments['total_amount'],
             }
         }
     else:
         # Contact user summary
         try:
             contact = request.user.contact_profile
+            invoices = invoice_metrics(customer=contact)
+            bills = bill_metrics(vendor=contact)
             summary = {
                 'invoices': {
-                    'total': CustomerInvoice.objects.filter(customer=contact).count(),
-                    'pending': CustomerInvoice.objects.filter(customer=contact, status='pending').count(),
-                    'paid': CustomerInvoice.objects.filter(customer=contact, status='paid').count(),
-                    'total_amount_due': CustomerInvoice.objects.filter(customer=contact, status='pending').aggregate(total=Sum('balance_due'))['total'] or 0,
+                    'total': invoices['total'],
+                    'pending': invoices['pending'],
+                    'paid': invoices['paid'],
+                    'total_amount_due': invoices['pending_amount'],
                 },
                 'bills': {
-                    'total': VendorBill.objects.filter(vendor=contact).count(),
-                    'pending': VendorBill.objects.filter(vendor=contact, status='pending').count(),
-                    'paid': VendorBill.objects.filter(vendor=contact, status='paid').count(),
-                    'total_amount_due': VendorBill.objects.filter(vendor=contact, status='pending').aggregate(total=Sum('balance_due'))['total'] or 0,
+                    'total': bills['total'],
+                    'pending': bills['pending'],
+                    'paid': bills['paid'],
+                    'total_amount_due': bills['pending_amount'],
                 }
             }
         except:
@@ -308,7 +401,6 @@ def convert_sales_order_to_invoice(request, pk):
 
     with db_transaction.atomic():
         invoice = CustomerInvoice.objects.create(
-            invoice_number=f"INV-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             customer=so.customer,
             invoice_date=timezone.now().date(),
             due_date=timezone.now().date(),
@@ -321,17 +413,9 @@ def convert_sales_order_to_invoice(request, pk):
             created_by=request.user,
         )
         # Create invoice items mirroring SO items
-        for item in so.items.all():
-            CustomerInvoiceItem.objects.create(
-                customer_invoice=invoice,
-                product=item.product,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                tax_percent=item.tax_percent,
-                tax_amount=item.tax_amount,
-                total=item.total,
-            )
-        serializer = CustomerInvoiceSerializer(invoice)
+        copy_lines(so.items.all(), invoice, CustomerInvoiceItem, 'customer_invoice')
+        post_customer_invoice(invoice)
+        serializer = CustomerInvoiceSerializer(prefetch_lines(invoice))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -345,7 +429,6 @@ def convert_purchase_order_to_bill(request, pk):
 
     with db_transaction.atomic():
         bill = VendorBill.objects.create(
-            bill_number=f"BILL-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             vendor=po.vendor,
             bill_date=timezone.now().date(),
             due_date=timezone.now().date(),
@@ -357,17 +440,9 @@ def convert_purchase_order_to_bill(request, pk):
             created_by=request.user,
         )
         # Create bill items mirroring PO items
-        for item in po.items.all():
-            VendorBillItem.objects.create(
-                vendor_bill=bill,
-                product=item.product,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                tax_percent=item.tax_percent,
-                tax_amount=item.tax_amount,
-                total=item.total,
-            )
-        serializer = VendorBillSerializer(bill)
+        copy_lines(po.items.all(), bill, VendorBillItem, 'vendor_bill')
+        post_vendor_bill(bill)
+        serializer = VendorBillSerializer(prefetch_lines(bill))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -387,47 +462,83 @@ def quick_allocate_payment(request):
     if target_type not in ['invoice', 'bill'] or amount <= 0:
         return Response({'error': 'Invalid parameters'}, status=status.HTTP_400_BAD_REQUEST)
 
-    with db_transaction.atomic():
-        if target_type == 'invoice':
-            invoice = get_object_or_404(CustomerInvoice, pk=target_id)
-            contact = invoice.customer
-            payment = Payment.objects.create(
-                payment_number=f"PAY-{timezone.now().strftime('%Y%m%d%H%M%S')}",
-                payment_type='customer_payment',
-                contact=contact,
-                payment_date=timezone.now().date(),
-                payment_method=method,
-                amount=amount,
-                created_by=request.user,
-            )
-            PaymentAllocation.objects.create(
-                payment=payment,
-                customer_invoice=invoice,
-                allocated_amount=amount,
-            )
-            invoice.paid_amount = (invoice.paid_amount or 0) + amount
-            invoice.save()
-            return Response({'message': 'Payment allocated to invoice', 'payment_number': payment.payment_number})
-        else:
-            bill = get_object_or_404(VendorBill, pk=target_id)
-            contact = bill.vendor
-            payment = Payment.objects.create(
-                payment_number=f"PAY-{timezone.now().strftime('%Y%m%d%H%M%S')}",
-                payment_type='vendor_payment',
-                contact=contact,
-                payment_date=timezone.now().date(),
-                payment_method=method,
-                amount=amount,
-                created_by=request.user,
-            )
-            PaymentAllocation.objects.create(
-                payment=payment,
-                vendor_bill=bill,
-                allocated_amount=amount,
-            )
-            bill.paid_amount = (bill.paid_amount or 0) + amount
-            bill.save()
-            return Response({'message': 'Payment allocated to bill', 'payment_number': payment.payment_number})
+    payment = record_payment(target_type, target_id, amount, method, request.user)
+    return Response({
+        'message': f'Payment allocated to {target_type}',
+        'payment_number': payment.payment_number,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def allocate_payment_to_documents(request, pk):
+    """
+    Allocate one payment across several invoices/bills.
+
+    Pass {"mode": "auto"} to settle the contact's oldest open documents first,
+    or {"allocations": [{"target_id": ..., "amount": ...}, ...]} to choose them.
+    """
+    if not (request.user.is_admin() or request.user.is_invoicing_user()):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    targets = None
+    if request.data.get('mode') != 'auto' and 'allocations' in request.data:
+        try:
+            targets = [
+                (int(item['target_id']), Decimal(str(item['amount'])))
+                for item in request.data.get('allocations') or []
+            ]
+        except (KeyError, TypeError, ValueError, ArithmeticError):
+            return Response({'error': 'Invalid allocations'}, status=status.HTTP_400_BAD_REQUEST)
+        if not targets:
+            return Response({'error': 'At least one allocation is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    allocations = allocate_payment(pk, targets)
+    payment = Payment.objects.select_related('contact', 'created_by').prefetch_related(
+        Prefetch('allocations', queryset=PaymentAllocation.objects.select_related('customer_invoice', 'vendor_bill'))
+    ).get(pk=pk)
+    return Response({
+        'message': f'Payment allocated to {len(allocations)} documents',
+        'allocated_amount': sum(allocation.allocated_amount for allocation in allocations),
+        'payment': PaymentSerializer(payment).data,
+    })
+
+
+# Bank Statement Import
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_bank_statement(request):
+    """
+    Import a bank statement CSV as payments matched to open invoices/bills.
+
+    Columns: date, amount (credits positive) or credit/debit, and optionally
+    reference, description, contact, gst_number and payment_method. Small
+    files are imported straight away; large ones are queued and can be
+    polled at the returned import.
+    """
+    if not (request.user.is_admin() or request.user.is_invoicing_user()):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({'error': 'A statement file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    statement_import = StatementImport.objects.create(file=upload, file_name=upload.name, created_by=request.user)
+    if start_import(statement_import):
+        statement_import.refresh_from_db()
+        return Response(StatementImportSerializer(statement_import).data, status=status.HTTP_201_CREATED)
+    return Response(StatementImportSerializer(statement_import).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def bank_statement_import_detail(request, pk):
+    """Progress and matched/unmatched summary of a statement import"""
+    if not (request.user.is_admin() or request.user.is_invoicing_user()):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    statement_import = get_object_or_404(StatementImport.objects.select_related('created_by'), pk=pk)
+    return Response(StatementImportSerializer(statement_import).data)
 
 
 # ---------- Create/Update with Items (SO/PO) ----------
@@ -465,7 +576,6 @@ def create_sales_order_with_items(request):
         customer = get_object_or_404(Contact, pk=customer_id)
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         so = SalesOrder.objects.create(
-            so_number=f"SO-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             so_date=payload.get('so_date') or timezone.now().date(),
             customer=customer,
             delivery_date=payload.get('delivery_date'),
@@ -475,23 +585,8 @@ def create_sales_order_with_items(request):
             grand_total=grand_total,
             created_by=request.user,
         )
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            SalesOrderItem.objects.create(
-                sales_order=so,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(SalesOrderSerializer(so).data, status=status.HTTP_201_CREATED)
+        create_lines(so, items, SalesOrderItem, 'sales_order')
+        return Response(SalesOrderSerializer(prefetch_lines(so)).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
@@ -516,25 +611,8 @@ def update_sales_order_with_items(request, pk):
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         so.subtotal, so.tax_total, so.grand_total = subtotal, tax_total, grand_total
         so.save()
-        # replace items
-        so.items.all().delete()
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            SalesOrderItem.objects.create(
-                sales_order=so,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(SalesOrderSerializer(so).data)
+        write_lines(so, items, SalesOrderItem, 'sales_order')
+        return Response(SalesOrderSerializer(prefetch_lines(so)).data)
 
 
 @api_view(['POST'])
@@ -555,7 +633,6 @@ def create_purchase_order_with_items(request):
         vendor = get_object_or_404(Contact, pk=vendor_id)
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         po = PurchaseOrder.objects.create(
-            po_number=f"PO-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             po_date=payload.get('po_date') or timezone.now().date(),
             vendor=vendor,
             delivery_date=payload.get('delivery_date'),
@@ -565,23 +642,8 @@ def create_purchase_order_with_items(request):
             grand_total=grand_total,
             created_by=request.user,
         )
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            PurchaseOrderItem.objects.create(
-                purchase_order=po,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(PurchaseOrderSerializer(po).data, status=status.HTTP_201_CREATED)
+        create_lines(po, items, PurchaseOrderItem, 'purchase_order')
+        return Response(PurchaseOrderSerializer(prefetch_lines(po)).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
@@ -606,24 +668,8 @@ def update_purchase_order_with_items(request, pk):
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         po.subtotal, po.tax_total, po.grand_total = subtotal, tax_total, grand_total
         po.save()
-        po.items.all().delete()
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            PurchaseOrderItem.objects.create(
-                purchase_order=po,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(PurchaseOrderSerializer(po).data)
+        write_lines(po, items, PurchaseOrderItem, 'purchase_order')
+        return Response(PurchaseOrderSerializer(prefetch_lines(po)).data)
 
 
 @api_view(['POST'])
@@ -642,7 +688,6 @@ def create_customer_invoice_with_items(request):
         customer = get_object_or_404(Contact, pk=payload.get('customer_id'))
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         inv = CustomerInvoice.objects.create(
-            invoice_number=f"INV-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             customer=customer,
             invoice_date=payload.get('invoice_date') or timezone.now().date(),
             due_date=payload.get('due_date') or timezone.now().date(),
@@ -654,23 +699,9 @@ def create_customer_invoice_with_items(request):
             grand_total=grand_total,
             created_by=request.user,
         )
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            CustomerInvoiceItem.objects.create(
-                customer_invoice=inv,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(CustomerInvoiceSerializer(inv).data, status=status.HTTP_201_CREATED)
+        create_lines(inv, items, CustomerInvoiceItem, 'customer_invoice')
+        post_customer_invoice(inv)
+        return Response(CustomerInvoiceSerializer(prefetch_lines(inv)).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
@@ -693,24 +724,9 @@ def update_customer_invoice_with_items(request, pk):
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         inv.subtotal, inv.tax_total, inv.grand_total = subtotal, tax_total, grand_total
         inv.save()
-        inv.items.all().delete()
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            CustomerInvoiceItem.objects.create(
-                customer_invoice=inv,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(CustomerInvoiceSerializer(inv).data)
+        write_lines(inv, items, CustomerInvoiceItem, 'customer_invoice')
+        post_customer_invoice(inv)
+        return Response(CustomerInvoiceSerializer(prefetch_lines(inv)).data)
 
 
 @api_view(['POST'])
@@ -726,7 +742,6 @@ def create_vendor_bill_with_items(request):
         vendor = get_object_or_404(Contact, pk=payload.get('vendor_id'))
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         bill = VendorBill.objects.create(
-            bill_number=f"BILL-{timezone.now().strftime('%Y%m%d%H%M%S')}",
             vendor=vendor,
             bill_date=payload.get('bill_date') or timezone.now().date(),
             due_date=payload.get('due_date') or timezone.now().date(),
@@ -737,23 +752,9 @@ def create_vendor_bill_with_items(request):
             grand_total=grand_total,
             created_by=request.user,
         )
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            VendorBillItem.objects.create(
-                vendor_bill=bill,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(VendorBillSerializer(bill).data, status=status.HTTP_201_CREATED)
+        create_lines(bill, items, VendorBillItem, 'vendor_bill')
+        post_vendor_bill(bill)
+        return Response(VendorBillSerializer(prefetch_lines(bill)).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['PUT'])
@@ -776,21 +777,6 @@ def update_vendor_bill_with_items(request, pk):
         subtotal, tax_total, grand_total = _calc_totals_from_items(items)
         bill.subtotal, bill.tax_total, bill.grand_total = subtotal, tax_total, grand_total
         bill.save()
-        bill.items.all().delete()
-        for it in items:
-            product = get_object_or_404(Product, pk=it.get('product_id'))
-            qty = Decimal(str(it.get('quantity', '0')))
-            price = Decimal(str(it.get('unit_price', '0')))
-            tax_pct = Decimal(str(it.get('tax_percent', '0')))
-            line_sub = qty * price
-            line_tax = (line_sub * tax_pct) / Decimal('100')
-            VendorBillItem.objects.create(
-                vendor_bill=bill,
-                product=product,
-                quantity=qty,
-                unit_price=price,
-                tax_percent=tax_pct,
-                tax_amount=line_tax,
-                total=line_sub + line_tax,
-            )
-        return Response(VendorBillSerializer(bill).data)
+        write_lines(bill, items, VendorBillItem, 'vendor_bill')
+        post_vendor_bill(bill)
+        return Response(VendorBillSerializer(prefetch_lines(bill)).data)
@@ -37,13 +37,13 @@ const AsyncContactSelect = ({
     () => {
       if (!debouncedSearch.trim()) return [];
       const params = { 
-        search: debouncedSearch.trim(),
-        page_size: 10
+        q: debouncedSearch.trim(),
+        limit: 10
       };
       if (contactType !== 'both') {
         params.type = contactType;
       }
-      return masterDataAPI.getContacts(params).then(res => res.data.results || res.data || []);
+      return masterDataAPI.autocompleteContacts(params).then(res => res.data || []);
     },
     {
       enabled: debouncedSearch.length > 0,
@@ -131,12 +131,18 @@ const AsyncContactSelect = ({
     setSelectedIndex(-1);
     
     if (onContactDetails) {
-      onContactDetails({
-        name: contact.name || '',
-        email: contact.email || '',
-        mobile: contact.mobile || '',
-        address: contact.address || '',
-        gst_number: contact.gst_number || ''
+      // Search results only carry id, name, type and GST number; fetch the rest
+      queryClient.fetchQuery(
+        ['contact-detail', contact.id],
+        () => masterDataAPI.getContact(contact.id).then(res => res.data)
+      ).then((details) => {
+        onContactDetails({
+          name: details.name || '',
+          email: details.email || '',
+          mobile: details.mobile || '',
+          address: details.address || '',
+          gst_number: details.gst_number || ''
+        });
       });
     }
   };
@@ -51,6 +51,7 @@ export const authAPI = {
 export const masterDataAPI = {
   // Contacts
   getContacts: (params) => api.get('/master-data/contacts/', { params }),
+  autocompleteContacts: (params) => api.get('/master-data/contacts/autocomplete/', { params }),
   getContact: (id) => api.get(`/master-data/contacts/${id}/`),
   createContact: (data) => api.post('/master-data/contacts/', data),
   updateContact: (id, data) => api.put(`/master-data/contacts/${id}/`, data),